@@ -1,2 +1,6 @@
 __version__ = "0.1.2"
-from .dfview import show
+from .dfview import show, show_async, show_many, stats
+from .budget import configure_budget, estimate
+from .diff import diff
+from .server import configure_sessions, release
+from .session import configure_storage
@@ -0,0 +1,112 @@
+"""Input backends: pandas DataFrames, Polars DataFrames and pyarrow Tables.
+
+dfview works on pandas DataFrames internally. Polars and pyarrow inputs are
+sliced natively and then wrapped as Arrow-backed pandas columns
+(``pd.ArrowDtype``), which reuse the Arrow buffers instead of copying them
+into NumPy arrays. Neither library is imported unless such an input is
+passed, so pandas stays the only hard dependency.
+"""
+
+import sys
+
+import pandas as pd
+
+
+class PandasBackend:
+    """pandas DataFrame input, used as is."""
+
+    def accepts(self, obj):
+        return isinstance(obj, pd.DataFrame)
+
+    def n_rows(self, obj):
+        return obj.shape[0]
+
+    def head(self, obj, n):
+        return obj.head(n)
+
+    def to_pandas(self, obj):
+        return obj
+
+
+class ArrowBackend:
+    """pyarrow Table and RecordBatch input."""
+
+    def accepts(self, obj):
+        pa = sys.modules.get("pyarrow")
+        return pa is not None and isinstance(obj, (pa.Table, pa.RecordBatch))
+
+    def n_rows(self, obj):
+        return obj.num_rows
+
+    def head(self, obj, n):
+        # Zero-copy: the slice shares the table's buffers
+        return obj.slice(0, n)
+
+    def to_pandas(self, obj):
+        return obj.to_pandas(types_mapper=_arrow_dtype)
+
+
+class PolarsBackend:
+    """Polars DataFrame input, converted through Arrow without copying."""
+
+    def accepts(self, obj):
+        pl = sys.modules.get("polars")
+        return pl is not None and isinstance(obj, pl.DataFrame)
+
+    def n_rows(self, obj):
+        return obj.height
+
+    def head(self, obj, n):
+        return obj.head(n)
+
+    def to_pandas(self, obj):
+        return ArrowBackend().to_pandas(obj.to_arrow())
+
+
+BACKENDS = [PandasBackend(), ArrowBackend(), PolarsBackend()]
+
+
+def backend_for(obj):
+    """Return the backend handling ``obj``.
+
+    Raises
+    ------
+    TypeError
+        If ``obj`` is not a supported frame type.
+    """
+    for backend in BACKENDS:
+        if backend.accepts(obj):
+            return backend
+    raise TypeError(
+        "Expected a pandas DataFrame, polars DataFrame or pyarrow Table, "
+        f"got {type(obj).__name__}"
+    )
+
+
+def _arrow_dtype(arrow_type):
+    import pyarrow as pa
+
+    # Dictionary columns become pandas categoricals, which keep their codes
+    if pa.types.is_dictionary(arrow_type):
+        return None
+    return pd.ArrowDtype(arrow_type)
+
+
+def arrow_text(values):
+    """Display text of an Arrow-backed integer or string column, cast by Arrow.
+
+    Returns None for other types, which are formatted by pandas.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrow_type = values.dtype.pyarrow_dtype
+    if not (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_string(arrow_type)
+        or pa.types.is_large_string(arrow_type)
+        or pa.types.is_string_view(arrow_type)
+    ):
+        return None
+    text = pc.fill_null(pc.cast(pa.array(values.array), pa.string()), "<NA>")
+    return text.to_numpy(zero_copy_only=False).tolist()
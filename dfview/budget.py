@@ -0,0 +1,188 @@
+"""Size estimates and the rendering strategy chosen from them.
+
+Before rendering, :func:`estimate` predicts the size of the page and the
+memory needed to build and open it from the frame's shape, its dtypes and
+one small block of rows. :func:`choose_strategy` then picks the cheapest way
+of showing the frame that fits the budget set with :func:`configure_budget`:
+
+``"static"``
+    Every row in the page, as before.
+``"compressed"``
+    Every row in the page, with the data gzip-compressed and decompressed
+    by the browser. Smaller files, the same memory.
+``"paged"``
+    The frame stays in this process and the page fetches blocks of rows
+    from the local server, so neither the page nor the memory needed grows
+    with the number of rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .backends import backend_for
+from .dfview import _PAGE_SCRIPT, _PAGE_STYLE, _column_kind, _format_column, _rendered_columns
+
+STRATEGIES = ("auto", "static", "compressed", "paged")
+
+_DEFAULT_PAGE_BYTES = 64 * 2**20
+_DEFAULT_MEMORY_BYTES = 2**30
+# Conservative size ratio of a payload to its base64-encoded gzip; text with
+# repeated values compresses much better than random floats
+_COMPRESSION_RATIO = 2.5
+_SAMPLE_CELLS = 100000
+_MAX_SAMPLE_ROWS = 1000
+
+# Text widths of cells whose width follows from the dtype: "True"/"False",
+# "2024-01-31 12:00:00", and a float with exponent
+_BOOL_CHARS = 5
+_DATETIME_CHARS = 19
+_DATE_CHARS = 10
+_TZ_CHARS = 6
+_SCIENTIFIC_CHARS = 12
+# JSON text of a float filter value: repr of a random double, or epoch
+# milliseconds such as 1700000000000.0
+_FLOAT_VALUE_CHARS = 18
+_EPOCH_VALUE_CHARS = 15
+
+# Approximate CPython sizes: a str object plus its list slot, an int rank,
+# a float value
+_STR_BYTES = 57
+_RANK_BYTES = 36
+_VALUE_BYTES = 32
+
+_budget = {"page_bytes": _DEFAULT_PAGE_BYTES, "memory_bytes": _DEFAULT_MEMORY_BYTES}
+
+
+def configure_budget(page_bytes=_DEFAULT_PAGE_BYTES, memory_bytes=_DEFAULT_MEMORY_BYTES):
+    """Set the limits :func:`dfview.show` keeps a page within.
+
+    Frames whose page would exceed ``page_bytes`` are shown as a compressed
+    page when that is estimated to fit, otherwise they are paged from the
+    local server, as are frames needing more than ``memory_bytes`` to
+    render.
+
+    Parameters
+    ----------
+    page_bytes : int, optional
+        Largest page written or served, in bytes.
+    memory_bytes : int, optional
+        Largest estimated memory for building a page in Python, in bytes.
+        The browser needs a similar amount to open it.
+    """
+    _budget["page_bytes"] = int(page_bytes)
+    _budget["memory_bytes"] = int(memory_bytes)
+
+
+def estimate(df, server=False):
+    """Estimate the page size and memory needed to show a frame in full.
+
+    Widths of number, boolean and datetime cells follow from the dtype and
+    the range of one block of up to 1000 rows; only text columns are
+    formatted, on that same block, so the estimate costs far less than
+    showing those rows.
+
+    Parameters
+    ----------
+    df : pd.DataFrame, polars.DataFrame or pyarrow.Table
+        The frame to show.
+    server : bool, optional
+        Estimate a server-mode page, which leaves out the filter values.
+
+    Returns
+    -------
+    dict
+        ``cells``, and the estimated ``page_bytes`` and ``memory_bytes``.
+    """
+    columns = _rendered_columns(backend_for(df).to_pandas(df))
+    n_rows = len(columns[0])
+    n_cells = n_rows * len(columns)
+    page_bytes = len(_PAGE_SCRIPT) + len(_PAGE_STYLE)
+    if n_cells == 0:
+        return {"cells": 0, "page_bytes": page_bytes, "memory_bytes": 3 * page_bytes}
+
+    n_sample = min(n_rows, _MAX_SAMPLE_ROWS, max(50, _SAMPLE_CELLS // len(columns)))
+    # One contiguous block from the middle of the frame: slicing it is cheap
+    # where gathering scattered rows is not
+    start = (n_rows - n_sample) // 2
+    # Dense ranks are at most the row count
+    rank_chars = len(str(n_rows)) + 2
+    row_chars = 0.0
+    row_memory = 0.0
+    for values in columns:
+        text_chars, value_chars = _cell_chars(values.iloc[start : start + n_sample])
+        # Quotes and separator around each cell's text
+        row_chars += text_chars + 4 + rank_chars
+        row_memory += _STR_BYTES + text_chars + _RANK_BYTES
+        if not server and value_chars is not None:
+            row_chars += value_chars + 2
+            row_memory += _VALUE_BYTES
+    page_bytes += int(row_chars * n_rows)
+    # The serialized payload, the page around it and its encoded copy
+    memory_bytes = int(row_memory * n_rows) + 3 * page_bytes
+    return {"cells": n_cells, "page_bytes": page_bytes, "memory_bytes": memory_bytes}
+
+
+def _cell_chars(block):
+    """Mean text length of a column's cells and of its filter values.
+
+    The second is None for columns filtered as text, which have no values.
+    """
+    dtype = block.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return _BOOL_CHARS, None
+    if _column_kind(block) == "number" and getattr(dtype, "kind", None) in ("i", "u", "f"):
+        numbers = block.to_numpy(dtype=np.float64, na_value=np.nan)
+        numbers = numbers[np.isfinite(numbers)]
+        sign = int((numbers < 0).any())
+        numbers = np.abs(numbers)
+        top = numbers.max() if len(numbers) else 0.0
+        digits = len(str(int(top))) + sign
+        if pd.api.types.is_integer_dtype(dtype):
+            return digits, digits + 2
+        small = numbers[numbers > 0]
+        if top >= 1e16 or (len(small) and small.min() < 1e-4):
+            return _SCIENTIFIC_CHARS + sign, _FLOAT_VALUE_CHARS
+        return digits + 1 + pd.get_option("display.precision"), _FLOAT_VALUE_CHARS
+    if _column_kind(block) == "datetime":
+        if isinstance(dtype, pd.ArrowDtype):
+            # Arrow dates have no time zone accessor; convert to datetime64
+            block = pd.to_datetime(block)
+        chars = _DATETIME_CHARS
+        if getattr(block.dt, "tz", None) is not None:
+            chars += _TZ_CHARS
+        elif not (block.dropna().dt.normalize() != block.dropna()).any():
+            chars = _DATE_CHARS
+        return chars, _EPOCH_VALUE_CHARS
+    texts = pd.Series(_format_column(block), dtype=object).str.len().mean()
+    return texts, None
+
+
+def fits_memory(sizes):
+    """Whether an :func:`estimate` is within the configured memory budget."""
+    return sizes["memory_bytes"] <= _budget["memory_bytes"]
+
+
+def choose_strategy(df, server=False, strategy="auto"):
+    """Pick how to show a frame within the configured budget.
+
+    Returns
+    -------
+    strategy : str
+        ``"static"``, ``"compressed"`` or ``"paged"``; ``strategy`` itself
+        unless it is ``"auto"``.
+    estimate : dict or None
+        As returned by :func:`estimate`; None when ``strategy`` is given, as
+        nothing is estimated then.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy!r}; use one of {', '.join(STRATEGIES)}")
+    if strategy != "auto":
+        return strategy, None
+    sizes = estimate(df, server)
+    if not fits_memory(sizes):
+        return "paged", sizes
+    if sizes["page_bytes"] <= _budget["page_bytes"]:
+        return "static", sizes
+    if sizes["page_bytes"] / _COMPRESSION_RATIO <= _budget["page_bytes"]:
+        return "compressed", sizes
+    return "paged", sizes
@@ -1,120 +1,1505 @@
+import ast
+import asyncio
 import atexit
+import base64
+import contextlib
+import gzip
+import json
+import logging
 import os
+import re
 import subprocess
 import sys
-import tempfile
-
+import threading
+import time
+import tracemalloc
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from html import escape as _escape
+
+import numpy as np
 import pandas as pd
 
-_temp_files = []
+try:
+    from pandas.io.formats.format import format_array as _format_array
+except ImportError:  # pragma: no cover - private pandas API
+    _format_array = None
+
+from .backends import arrow_text, backend_for
+from .session import clear_store, get_store
+
+_log = logging.getLogger("dfview")
+
+_launchers = []
+_executor = None
+_executor_lock = threading.Lock()
+_STATS_SIZE = 100
+_stats = deque(maxlen=_STATS_SIZE)
+_stats_lock = threading.Lock()
 
 
 def _cleanup_temp_files():
-    for path in _temp_files:
+    # Let browser launchers still starting up read their file first
+    for proc in list(_launchers):
         try:
-            os.unlink(path)
-        except OSError:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
             pass
-    _temp_files.clear()
+    clear_store()
 
 
 atexit.register(_cleanup_temp_files)
 
 
-def show(df, max_rows=None, open_browser=True):
-    """Show a pandas DataFrame in a browser.
+def show(
+    df,
+    max_rows=None,
+    open_browser=True,
+    server=False,
+    block=True,
+    reuse_tab=False,
+    name=None,
+    profile=False,
+    inline=False,
+    strategy="auto",
+):
+    """Show a DataFrame in a browser.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The DataFrame to display.
+    df : pd.DataFrame, polars.DataFrame or pyarrow.Table
+        The DataFrame to display. Polars frames and Arrow tables are sliced
+        natively and shown through Arrow-backed pandas columns, without
+        copying their data into NumPy arrays.
     max_rows : int, optional
         Maximum number of rows to display. If None, all rows are shown.
     open_browser : bool, optional
         If True (default), open the HTML in the default browser.
+    server : bool, optional
+        If True, serve the page from a local HTTP server running in this
+        process and keep the DataFrame here, so range, substring and regex
+        filters are evaluated by pandas instead of in the page. The server
+        lives as long as the Python process.
+    block : bool, optional
+        If False, take a snapshot of the DataFrame and render it in a
+        background thread, returning immediately. Later changes to ``df``
+        do not affect the snapshot.
+    reuse_tab : bool, optional
+        If True, show the frame in a single viewer tab served by the local
+        server instead of opening a new one per call. The tab switches to
+        each new frame and lists recent ones; a browser is only opened when
+        no viewer tab is connected.
+    name : str, optional
+        Label for the frame in the reusable tab's history.
+    profile : bool, optional
+        If True, record the wall time, peak traced memory and output size of
+        each rendering phase. Records are returned by :func:`stats` and
+        logged to the ``dfview`` logger. In server mode the page also posts
+        back its parse, first render, sort and filter timings.
+    inline : bool, optional
+        If True, display the viewer in the current Jupyter cell's output
+        instead of a browser tab. The frame stays in the kernel and the
+        output holds only the first rows; further rows, sort orders, filter
+        results and value lists are fetched from the kernel as they are
+        needed, so large frames display at once and the notebook file stays
+        small. ``open_browser``, ``server``, ``block``, ``reuse_tab`` and
+        ``strategy`` are ignored.
+    strategy : {"auto", "static", "compressed", "paged"}, optional
+        How the rows reach the page. ``"static"`` embeds them all,
+        ``"compressed"`` embeds them gzip-compressed, and ``"paged"`` keeps
+        the frame in this process and has the page fetch blocks of rows
+        from the local server, as in server mode. ``"auto"`` (default)
+        estimates the page size and memory needed and picks the first that
+        fits the budget set with :func:`dfview.configure_budget`. The
+        choice is shown in the page's info bar. Asked for HTML with
+        ``open_browser=False`` outside server mode, ``"auto"`` does not page
+        a frame: it warns and compresses it when that fits the memory
+        budget, and raises ValueError otherwise.
 
     Returns
     -------
     str or None
-        The generated HTML string when ``open_browser=False``, otherwise None.
+        The generated HTML string when ``open_browser=False``, otherwise
+        None. In server mode the viewer URL is returned instead, and with
+        ``reuse_tab=True`` the URL of the reusable tab. Paged frames are
+        served, so their URL is returned even when ``server`` is False.
+        With ``block=False`` a :class:`concurrent.futures.Future` resolving
+        to that value is returned. With ``inline=True`` the viewer is
+        displayed and None is returned.
     """
-    total_rows = df.shape[0]
-    if max_rows:
-        df = df.head(max_rows)
+    df, total_rows = _as_pandas(df, max_rows)
+    mode = "inline" if inline else "server" if server else "static"
+    profile = _Profile(df, mode, reuse_tab) if profile else _NO_PROFILE
+
+    if inline:
+        from .notebook import show_inline
 
-    html = _build_html(df, total_rows)
+        try:
+            show_inline(df, total_rows, profile)
+        finally:
+            profile.finish()
+        return None
+
+    if not block:
+        with profile.phase("snapshot"):
+            df = _snapshot(df)
+        return _render_executor().submit(
+            _show, df, total_rows, open_browser, server, reuse_tab, name, profile, strategy=strategy
+        )
+    return _show(df, total_rows, open_browser, server, reuse_tab, name, profile, strategy=strategy)
+
+
+async def show_async(
+    df,
+    max_rows=None,
+    open_browser=True,
+    server=False,
+    reuse_tab=False,
+    name=None,
+    profile=False,
+    strategy="auto",
+):
+    """Awaitable version of :func:`show`.
+
+    The DataFrame is snapshotted and rendered in a background thread, so the
+    event loop is not blocked. Parameters and result are as for :func:`show`.
+    """
+    future = show(
+        df,
+        max_rows,
+        open_browser,
+        server,
+        block=False,
+        reuse_tab=reuse_tab,
+        name=name,
+        profile=profile,
+        strategy=strategy,
+    )
+    return await asyncio.wrap_future(future)
+
+
+def show_many(frames, max_rows=None, open_browser=True):
+    """Show several DataFrames in one page, with a tab per frame.
+
+    The page includes the viewer's script and styles once. Each frame's data
+    is only decoded when its tab is first selected, so opening a page of
+    many frames costs about as much as opening the first one.
+
+    Parameters
+    ----------
+    frames : dict
+        Tab names mapped to frames, in tab order. Frames can be anything
+        :func:`show` accepts.
+    max_rows : int, optional
+        Maximum number of rows to display per frame.
+    open_browser : bool, optional
+        If True (default), open the page in the default browser.
+
+    Returns
+    -------
+    str or None
+        The generated HTML string when ``open_browser=False``, otherwise None.
+    """
+    if not frames:
+        raise ValueError("show_many() needs at least one frame")
+    items = [(str(name), *_as_pandas(df, max_rows)) for name, df in frames.items()]
+    html = _build_bundle_html(items)
 
     if open_browser:
-        with tempfile.NamedTemporaryFile("w", delete=False, suffix=".html", encoding="utf-8") as f:
-            f.write(html)
-            _temp_files.append(f.name)
-            _open_in_browser(f.name)
+        _open_in_browser(get_store().add(html))
         return None
 
     return html
 
 
+def _as_pandas(df, max_rows):
+    """The displayed rows of any supported frame as pandas, and its total row count."""
+    backend = backend_for(df)
+    total_rows = backend.n_rows(df)
+    if max_rows:
+        df = backend.head(df, max_rows)
+    return backend.to_pandas(df), total_rows
+
+
+def stats():
+    """Return the records of recent ``show(..., profile=True)`` calls, oldest first.
+
+    Each record is a dict with the frame's ``rows`` and ``cols``, the
+    ``mode``, the chosen ``strategy`` and its size ``estimate`` (None when
+    the strategy was given), per-phase ``phases`` (``seconds`` and
+    ``peak_bytes`` of traced memory), the ``bytes`` of the payload and page,
+    ``total_seconds``, ``peak_bytes``, and the ``page`` timings in
+    milliseconds posted back by server-mode pages.
+    """
+    with _stats_lock:
+        return [dict(r, phases=dict(r["phases"]), page=dict(r["page"])) for r in _stats]
+
+
+def _show(
+    df,
+    total_rows,
+    open_browser,
+    server,
+    reuse_tab=False,
+    name=None,
+    profile=None,
+    marks=None,
+    strategy="auto",
+):
+    from .budget import choose_strategy, fits_memory
+
+    profile = profile or _NO_PROFILE
+    try:
+        with profile.phase("estimate"):
+            chosen, estimate = choose_strategy(df, server, strategy)
+        if chosen == "paged" and strategy == "auto" and not (server or open_browser or reuse_tab):
+            # The caller asked for the page's HTML, which a paged frame has not;
+            # a compressed page needs as much memory as a static one
+            if not fits_memory(estimate):
+                raise ValueError(
+                    f"Building this frame's page would take about {_format_bytes(estimate['memory_bytes'])}, "
+                    "over the dfview memory budget. Pass server=True to page it from Python, "
+                    'strategy="static" or "compressed" to build it anyway, or raise the budget '
+                    "with dfview.configure_budget(memory_bytes=...)."
+                )
+            warnings.warn(
+                "The frame exceeds the dfview budget but open_browser=False asks for HTML; "
+                "showing it as a compressed page. Pass server=True to page it from Python.",
+                stacklevel=3,
+            )
+            chosen = "compressed"
+        strategy = chosen
+        profile.plan(strategy, estimate)
+        if estimate is not None and strategy != "static":
+            _log.info(
+                "show %dx%d: %s, estimated page %s, memory %s",
+                df.shape[0],
+                df.shape[1],
+                strategy,
+                _format_bytes(estimate["page_bytes"]),
+                _format_bytes(estimate["memory_bytes"]),
+            )
+        plan = (strategy, estimate)
+        # Paged frames stay here and are served by the local server
+        server = server or strategy == "paged"
+
+        if reuse_tab:
+            return _show_in_tab(df, total_rows, open_browser, server, name, profile, marks, plan)
+
+        if server:
+            from .server import get_server
+
+            viewer = get_server()
+            url = f"{viewer.url}/view/{_serve(viewer, df, total_rows, profile, marks, plan)}"
+            if open_browser:
+                with profile.phase("launch"):
+                    _open_in_browser(url)
+            return url
+
+        html = _build_html(df, total_rows, profile=profile, marks=marks, plan=plan)
+
+        if open_browser:
+            with profile.phase("write"):
+                path = get_store().add(html)
+            with profile.phase("launch"):
+                _open_in_browser(path)
+            return None
+
+        return html
+    finally:
+        profile.finish()
+
+
+def _show_in_tab(df, total_rows, open_browser, server, name, profile, marks=None, plan=None):
+    """Add the frame to the reusable viewer tab, opening it if none is connected."""
+    from .server import get_server
+
+    viewer = get_server()
+    if server:
+        token = _serve(viewer, df, total_rows, profile, marks, plan, keep=True)
+        viewer.tab.add(name, df.shape, url=f"/view/{token}", token=token)
+    else:
+        html = _build_html(df, total_rows, profile=profile, marks=marks, plan=plan)
+        with profile.phase("write"):
+            viewer.tab.add(name, df.shape, html=html)
+    url = viewer.tab_url
+    if open_browser and not viewer.tab.connected():
+        with profile.phase("launch"):
+            _open_in_browser(url)
+    return url
+
+
+def _serve(viewer, df, total_rows, profile, marks=None, plan=None, keep=False):
+    """Register a server-mode session for the frame and return its token."""
+    from .server import FrameSession
+
+    session = FrameSession(df, marks)
+    token = viewer.register(session, keep)
+    session.page = _build_html(
+        df, total_rows, api_url=f"/api/{token}", profile=profile, marks=marks, plan=plan, session=session
+    )
+    session.timings = profile.page
+    return token
+
+
+class _Profile:
+    """Wall time, peak traced memory and output size of one show() call.
+
+    tracemalloc is started for the duration of the call unless it is
+    already tracing; it slows allocations down, so profiling is opt-in.
+    """
+
+    enabled = True
+
+    def __init__(self, df, mode, reuse_tab):
+        self.page = {}
+        self.record = {
+            "rows": df.shape[0],
+            "cols": df.shape[1],
+            "mode": mode,
+            "strategy": None,
+            "estimate": None,
+            "reuse_tab": reuse_tab,
+            "phases": {},
+            "bytes": {},
+            "page": self.page,
+        }
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record["phases"][name] = {
+                "seconds": time.perf_counter() - start,
+                "peak_bytes": max(0, tracemalloc.get_traced_memory()[1] - base),
+            }
+
+    def output(self, name, text):
+        self.record["bytes"][name] = len(text.encode("utf-8"))
+
+    def plan(self, strategy, estimate):
+        self.record["strategy"] = strategy
+        self.record["estimate"] = None if estimate is None else dict(estimate)
+
+    def finish(self):
+        record = self.record
+        record["total_seconds"] = time.perf_counter() - self._start
+        record["peak_bytes"] = max((p["peak_bytes"] for p in record["phases"].values()), default=0)
+        if self._owns_tracing:
+            tracemalloc.stop()
+        with _stats_lock:
+            _stats.append(record)
+        phases = ", ".join(f"{k} {v['seconds']:.3f}s" for k, v in record["phases"].items())
+        _log.info(
+            "show %dx%d %s: %.3fs (%s), %d bytes, peak %d bytes",
+            record["rows"],
+            record["cols"],
+            record["mode"],
+            record["total_seconds"],
+            phases,
+            record["bytes"].get("page", 0),
+            record["peak_bytes"],
+        )
+
+
+class _NoProfile:
+    enabled = False
+    page = None
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def output(self, name, text):
+        pass
+
+    def plan(self, strategy, estimate):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NO_PROFILE = _NoProfile()
+
+
+def _render_executor():
+    """Single background thread for ``block=False`` renders, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dfview")
+        return _executor
+
+
+def _copy_on_write():
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except (AttributeError, KeyError):
+        return False
+
+
+def _snapshot(df):
+    """Copy of ``df`` unaffected by later changes to the caller's frame.
+
+    Under copy-on-write a shallow copy is enough and copies no data.
+    """
+    return df.copy(deep=not _copy_on_write())
+
+
 def _open_in_browser(path):
-    """Open a file in the default browser without ResourceWarning."""
+    """Open a file or URL in the default browser without waiting for it."""
     if sys.platform == "win32":
         os.startfile(path)
-    elif sys.platform == "darwin":
-        cmd = ["open", path]
+        return
+    cmd = ["open" if sys.platform == "darwin" else "xdg-open", path]
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    _launchers.append(proc)
+    # Reap the launcher in the background, without ResourceWarning or zombies
+    threading.Thread(target=_reap_launcher, args=(proc,), daemon=True).start()
+
+
+def _reap_launcher(proc):
+    proc.wait()
+    try:
+        _launchers.remove(proc)
+    except ValueError:
+        pass
+
+
+def _rendered_column(df, col):
+    """Values of rendered column ``col``: index levels first, then the columns."""
+    if not 0 <= col < _n_rendered_columns(df):
+        raise ValueError(f"No column {col!r}")
+    n_levels = df.index.nlevels
+    if col < n_levels:
+        return pd.Series(df.index.get_level_values(col))
+    return df.iloc[:, col - n_levels].reset_index(drop=True)
+
+
+def _n_rendered_columns(df):
+    return df.index.nlevels + df.shape[1]
+
+
+def _rendered_columns(df):
+    """All rendered columns at once; cheaper than repeated ``_rendered_column`` calls."""
+    index = [pd.Series(df.index.get_level_values(i)) for i in range(df.index.nlevels)]
+    flat = df.reset_index(drop=True)
+    return index + [values for _, values in flat.items()]
+
+
+# Cells per 2-D block of same-dtype columns; bounds the text formatted at once
+_BLOCK_CELLS = 2**20
+
+
+def _dtype_blocks(columns):
+    """Integer, boolean and float columns of plain NumPy dtypes, stacked per dtype.
+
+    Returns ``(indices, block)`` pairs: the positions of the columns in
+    ``columns`` and a 2-D array with one row per column. Blocks are split to
+    hold about ``_BLOCK_CELLS`` cells at most.
+    """
+    groups = {}
+    for i, values in enumerate(columns):
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iubf":
+            groups.setdefault(values.dtype, []).append(i)
+    n_rows = len(columns[0]) if columns else 0
+    step = max(1, _BLOCK_CELLS // max(1, n_rows))
+    blocks = []
+    for indices in groups.values():
+        for start in range(0, len(indices), step):
+            part = indices[start:start + step]
+            blocks.append((part, np.vstack([columns[i].to_numpy() for i in part])))
+    return blocks
+
+
+def _rank(values):
+    """Dense 1-based rank of ``values``, missing values ranked last.
+
+    Numeric, datetime and boolean data is ranked by value. Text is ranked
+    numerically when every non-missing entry parses as a number, otherwise
+    case-insensitively with case as the tie-breaker, so every distinct value
+    keeps its own rank.
+    """
+    with warnings.catch_warnings():
+        # pandas ranks Arrow-backed columns with options newer pyarrow deprecates
+        warnings.simplefilter("ignore", FutureWarning)
+        return _dense_rank(pd.Series(values).reset_index(drop=True))
+
+
+def _dense_rank(s):
+    if s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+        numeric = pd.to_numeric(s, errors="coerce")
+        if isinstance(numeric.dtype, pd.ArrowDtype):
+            # Arrow keeps unparseable text as NaN rather than as missing
+            numeric = pd.Series(numeric.to_numpy(dtype=np.float64, na_value=np.nan))
+        if numeric.notna().sum() == s.notna().sum():
+            s = numeric
+        else:
+            text = s.astype(str).where(s.notna())
+            folded = text.str.lower().rank(method="dense", na_option="bottom")
+            exact = text.rank(method="dense", na_option="bottom")
+            s = folded * (exact.max() + 1) + exact
+    try:
+        ranks = s.rank(method="dense", na_option="bottom")
+    except (TypeError, NotImplementedError):
+        ranks = s.astype(str).rank(method="dense", na_option="bottom")
+    return ranks.to_numpy(dtype=np.int64)
+
+
+def _column_ranks(df, columns=None, blocks=None):
+    """Per-column dense ranks, one array per index level followed by each column.
+
+    The order matches the cells of a rendered row, so the page can sort by
+    comparing small integers instead of re-parsing cell text. ``columns``
+    and ``blocks`` are the frame's rendered columns and their
+    :func:`_dtype_blocks`, if already at hand.
+    """
+    if columns is None:
+        columns = _rendered_columns(df)
+    if blocks is None:
+        blocks = _dtype_blocks(columns)
+    ranks = [None] * len(columns)
+    # Plain numeric columns are ranked a dtype block at a time, which
+    # matters for frames with thousands of columns.
+    for indices, block in blocks:
+        if block.dtype.kind == "b":
+            continue
+        block_ranks = pd.DataFrame(block.T).rank(method="dense", na_option="bottom")
+        block_ranks = block_ranks.to_numpy(dtype=np.int64)
+        for k, i in enumerate(indices):
+            ranks[i] = block_ranks[:, k]
+    return [_rank(c) if r is None else r for c, r in zip(columns, ranks)]
+
+
+def _sort_order(ranks, keys):
+    """Row permutation for a multi-column sort over precomputed ranks.
+
+    Parameters
+    ----------
+    ranks : list of np.ndarray
+        Rank arrays as returned by :func:`_column_ranks`.
+    keys : list of (int, bool)
+        ``(column, ascending)`` pairs, primary key first.
+
+    Returns
+    -------
+    np.ndarray
+        Original row positions in sorted order. Ties keep their original order.
+    """
+    if not keys:
+        return np.arange(len(ranks[0]) if ranks else 0)
+    # np.lexsort treats the last key as primary.
+    cols = [ranks[col] if ascending else -ranks[col] for col, ascending in reversed(keys)]
+    return np.lexsort(cols)
+
+
+def _column_kind(values):
+    """Filter kind of a column: ``"number"``, ``"datetime"`` or ``"text"``."""
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "text"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "number"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+
+def _numeric_values(values):
+    """Float array of a number or datetime column, datetimes as UTC epoch milliseconds."""
+    if _column_kind(values) == "datetime":
+        if isinstance(values.dtype, pd.ArrowDtype):
+            # Arrow dates have no time zone accessor; convert to datetime64
+            values = pd.to_datetime(values)
+        if getattr(values.dt, "tz", None) is not None:
+            values = values.dt.tz_convert(None)
+        out = values.to_numpy(dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+        out[values.isna().to_numpy()] = np.nan
+        return out
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _json_floats(arr):
+    """List of floats for embedding as JSON, NaN as None; a list per row of 2-D arrays."""
+    out = arr.astype(object)
+    out[np.isnan(arr)] = None
+    return out.tolist()
+
+
+def _filter_values(columns, kinds, blocks):
+    """:func:`_numeric_values` of the number and datetime columns as JSON lists, else None."""
+    values = [None] * len(columns)
+    for indices, block in blocks:
+        if block.dtype.kind == "b":
+            continue
+        for i, row in zip(indices, _json_floats(block.astype(np.float64, copy=False))):
+            values[i] = row
+    for i, (c, kind) in enumerate(zip(columns, kinds)):
+        if values[i] is None and kind != "text":
+            values[i] = _json_floats(_numeric_values(c))
+    return values
+
+
+def _filter_mask(df, conditions):
+    """Boolean row mask for range, substring and regex filter conditions.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The displayed DataFrame.
+    conditions : list of dict
+        Each condition has a rendered column index ``col`` and a ``kind``:
+        ``"range"`` with optional ``min``/``max`` bounds (datetimes as epoch
+        milliseconds), or ``"contains"``/``"regex"`` with a ``pattern``.
+        Text matching is case-insensitive. All conditions must hold.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask over the rows of ``df``.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for cond in conditions:
+        values = _rendered_column(df, cond["col"])
+        kind = cond["kind"]
+        if kind == "range":
+            numbers = pd.Series(_numeric_values(values))
+            lo = -np.inf if cond.get("min") is None else cond["min"]
+            hi = np.inf if cond.get("max") is None else cond["max"]
+            hit = numbers.between(lo, hi)
+        elif kind in ("contains", "regex"):
+            text = values.astype(str).where(values.notna())
+            with warnings.catch_warnings():
+                # Capture groups in a user's regex are fine for matching
+                warnings.simplefilter("ignore", UserWarning)
+                hit = text.str.contains(cond["pattern"], case=False, regex=kind == "regex", na=False)
+        else:
+            raise ValueError(f"Unknown filter kind: {kind!r}")
+        mask &= hit.to_numpy(dtype=bool)
+    return mask
+
+
+# Methods a query may call, e.g. ``name.str.contains('x')`` or ``x.isna()``
+_QUERY_METHODS = frozenset(
+    {
+        "contains", "startswith", "endswith", "match", "fullmatch", "len", "lower", "upper",
+        "strip", "isna", "notna", "isnull", "notnull", "isin", "between", "abs",
+    }
+)
+_QUERY_NODES = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Name, ast.Constant,
+    ast.List, ast.Tuple, ast.keyword, ast.Load, ast.boolop, ast.operator, ast.unaryop, ast.cmpop,
+)
+_BACKTICK_NAME = re.compile(r"`[^`]*`")
+
+
+def _check_query(expr):
+    """Reject query expressions doing more than comparing and combining columns.
+
+    ``DataFrame.eval`` would otherwise call any method of a column, such as
+    ``to_csv``, on behalf of whoever can reach the page.
+    """
+    try:
+        # Backtick-quoted column names are not Python; any name will do here
+        tree = ast.parse(_BACKTICK_NAME.sub("_", expr), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid query: {exc.msg}") from exc
+    methods = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Attribute) and node.func.attr in _QUERY_METHODS):
+                raise ValueError(
+                    f"Queries can only call {', '.join(sorted(_QUERY_METHODS))} on columns"
+                )
+            methods.add(id(node.func))
+        elif isinstance(node, ast.Attribute):
+            if id(node) not in methods and node.attr != "str":
+                raise ValueError(f"Queries cannot use .{node.attr}")
+        elif not isinstance(node, _QUERY_NODES):
+            raise ValueError(f"Queries cannot use {type(node).__name__} expressions")
+
+
+def _query_mask(df, expr):
+    """Boolean row mask for a :meth:`pandas.DataFrame.query` expression.
+
+    The expression is checked by :func:`_check_query`, then evaluated with
+    :meth:`pandas.DataFrame.eval`, which uses numexpr when it is installed.
+    """
+    _check_query(expr)
+    try:
+        result = df.eval(expr)
+    except Exception as exc:
+        # Any failure is the expression's: unknown names, methods not
+        # available for a column's dtype, mismatched types
+        raise ValueError(f"Invalid query: {exc}") from exc
+    if not isinstance(result, pd.Series) or not pd.api.types.is_bool_dtype(result.dtype):
+        raise ValueError("Query must evaluate to a boolean condition")
+    return result.to_numpy(dtype=bool, na_value=False)
+
+
+def _encode_mask(mask):
+    """Pack a boolean row mask into base64 text, one bit per row."""
+    return base64.b64encode(np.packbits(mask).tobytes()).decode("ascii")
+
+
+def _decode_mask(packed, n_rows):
+    """Inverse of :func:`_encode_mask`."""
+    bits = np.frombuffer(base64.b64decode(packed), dtype=np.uint8)
+    return np.unpackbits(bits, count=n_rows).astype(bool)
+
+
+_AGGREGATIONS = ("size", "count", "sum", "mean", "min", "max", "median", "std", "nunique")
+
+
+def _group_codes(keys):
+    """Dense group codes for the rows of one or more key columns.
+
+    Groups are numbered in sorted key order and missing keys form their own
+    group, placed last.
+
+    Parameters
+    ----------
+    keys : list of pd.Series
+        The key columns, all of the same length.
+
+    Returns
+    -------
+    codes : np.ndarray
+        Group number of every row.
+    first : np.ndarray
+        Position of the first row of each group, used to look up key values.
+    """
+    codes = None
+    for values in keys:
+        try:
+            key_codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+        except TypeError:
+            key_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        except NotImplementedError:
+            # Nested Arrow values (lists, structs) are grouped by their text
+            text = values.astype(str).where(values.notna())
+            key_codes, uniques = pd.factorize(text, sort=True, use_na_sentinel=False)
+        if codes is None:
+            codes = key_codes
+        else:
+            # Combine with the previous keys; re-factorizing keeps codes dense
+            codes = pd.factorize(codes * len(uniques) + key_codes, sort=True)[0]
+    codes = codes.astype(np.int64)
+    first = np.unique(codes, return_index=True)[1]
+    return codes, first
+
+
+def _group_summary(df, keys, values, agg, grouping, mask=None):
+    """Aggregate the displayed DataFrame over precomputed group codes.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The displayed DataFrame.
+    keys, values : list of int
+        Rendered column indices of the key and value columns.
+    agg : str
+        One of ``_AGGREGATIONS``; ``"size"`` counts rows and ignores ``values``.
+    grouping : tuple
+        ``(codes, first)`` as returned by :func:`_group_codes` for ``keys``.
+    mask : np.ndarray, optional
+        Only rows where the mask is True are aggregated.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per non-empty group: the key values followed by the aggregates.
+    """
+    if agg not in _AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation: {agg!r}")
+    codes, first = grouping
+    n_groups = len(first)
+    if mask is not None:
+        codes = codes[mask]
+    sizes = np.bincount(codes, minlength=n_groups)
+    result = pd.DataFrame(
+        {_column_label(df, k): _rendered_column(df, k).take(first).to_numpy() for k in keys}
+    )
+    if agg == "size" or not values:
+        result["size"] = sizes
     else:
-        cmd = ["xdg-open", path]
+        for v in values:
+            column = _rendered_column(df, v)
+            if mask is not None:
+                column = column[mask].reset_index(drop=True)
+            summary = _bincount_aggregate(column, codes, agg, n_groups)
+            if summary is None:
+                summary = column.groupby(codes).agg(agg).reindex(range(n_groups)).to_numpy()
+            result[f"{_column_label(df, v)} ({agg})"] = summary
+    return result[sizes > 0].reset_index(drop=True)
+
+
+def _bincount_aggregate(values, codes, agg, n_groups):
+    """``count``, ``sum`` or ``mean`` per group, summed straight over the group codes.
+
+    Returns None for other aggregations and for sums and means of columns
+    that are not numeric, which go through ``groupby`` instead.
+    """
+    if agg == "count":
+        present = values.notna().to_numpy()
+        return np.bincount(codes, weights=present, minlength=n_groups).astype(np.int64)
+    if agg not in ("sum", "mean") or values.dtype.kind not in "iufb":
+        return None
+    if agg == "sum" and values.dtype.kind in "iub":
+        # Float weights lose integers past 2**53; add them up exactly, with
+        # the wrap-around of pandas' own integer sums
+        present = values.notna().to_numpy()
+        kind = np.uint64 if values.dtype.kind == "u" else np.int64
+        sums = np.zeros(n_groups, dtype=kind)
+        np.add.at(sums, codes[present], values.to_numpy(dtype=kind, na_value=0)[present])
+        return sums
+    numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(numbers)
+    sums = np.bincount(codes, weights=np.where(present, numbers, 0.0), minlength=n_groups)
+    if agg == "sum":
+        return sums
+    counts = np.bincount(codes, weights=present, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def _column_label(df, col):
+    """Display name of a rendered column."""
+    n_levels = df.index.nlevels
+    if col < n_levels:
+        name = df.index.names[col]
+        return "index" if name is None else str(name)
+    name = df.columns[col - n_levels]
+    return " / ".join(map(str, name)) if isinstance(name, tuple) else str(name)
+
+
+def _json_rows(frame):
+    """Rows of ``frame`` as JSON-ready lists; non-numeric values as text, missing as None.
+
+    Infinite numbers, which JSON cannot hold, are sent as text too.
+    """
+    columns = []
+    for _, values in frame.items():
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            column = values.astype(object).where(values.notna(), None)
+            if values.dtype.kind == "f":
+                infinite = np.isinf(values.to_numpy(dtype=np.float64, na_value=np.nan))
+                column[infinite] = values[infinite].astype(str)
+            columns.append(column)
+        else:
+            columns.append(values.astype(str).astype(object).where(values.notna(), None))
+    return [list(row) for row in zip(*columns)] if columns else []
+
+
+def _script_json(obj):
+    """JSON for embedding inside a ``<script>`` element."""
+    return json.dumps(obj).replace("</", "<\\/")
+
+
+def _format_column(values):
+    """Display text of every value in a column, formatted as ``to_html`` does."""
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iub":
+        return values.to_numpy().astype(str).tolist()
+    if isinstance(values.dtype, pd.ArrowDtype):
+        text = arrow_text(values)
+        if text is not None:
+            return text
+    if _format_array is None:
+        return values.astype(str).tolist()
+    # The backing array, as to_html formats it: object text unquoted, floats
+    # to a common precision
+    return [text.strip() for text in _format_array(values._values, None)]
+
+
+def _format_columns(columns, blocks=None, layouts=None):
+    """Display text of every column, as :func:`_format_column` gives it.
+
+    Integer, boolean and float64 columns are formatted a dtype block at a
+    time (``blocks``, see :func:`_dtype_blocks`), so wide frames cost about
+    as much as long ones with as many cells. ``layouts`` holds the
+    :func:`_float_layout` of whole columns the given ones are part of, for
+    float columns to be formatted as in the whole column.
+    """
+    texts = [None] * len(columns)
+    if _format_array is not None:
+        if blocks is None:
+            blocks = _dtype_blocks(columns)
+        for indices, block in blocks:
+            if block.dtype.kind != "f":
+                formatted = block.astype(str).tolist()
+            elif block.dtype == np.float64:
+                chosen = None if layouts is None else [layouts[i] for i in indices]
+                if chosen is not None and None not in chosen:
+                    chosen = tuple(np.array(a) for a in zip(*chosen))
+                formatted = _format_float_block(block, chosen)
+            else:
+                continue
+            for i, text in zip(indices, formatted):
+                texts[i] = text
+        for i, layout in enumerate(layouts or []):
+            if texts[i] is None and layout is not None:
+                texts[i] = _format_float_layout(columns[i], layout)
+    return [_format_column(c) if text is None else text for c, text in zip(columns, texts)]
+
+
+def _format_float_layout(values, layout):
+    """Text of a float column laid out as in the whole column it is part of."""
+    numbers = values.to_numpy(dtype=np.float64)[None, :]
+    return _format_float_block(numbers, (np.array([layout[0]]), np.array([layout[1]])))[0]
+
+
+def _format_float_block(block, layouts=None):
+    """Text of each row of a 2-D float array, as ``format_array`` formats a column.
+
+    Values get ``display.precision`` decimals, less the trailing zeros all
+    of a column's values share, keeping one, or scientific notation where
+    ``format_array`` switches to it. ``layouts`` fixes those choices per row
+    instead, as ``(scientific, cut)`` arrays (see :func:`_float_layout`). When
+    a display option changes float formatting every column is None, to be
+    formatted one at a time.
+    """
+    digits = pd.get_option("display.precision")
+    if digits < 1 or pd.get_option("display.float_format") or pd.get_option("display.chop_threshold"):
+        return [None] * len(block)
+    if block.shape[1] == 0:
+        return [[] for _ in block]
+    if layouts is None:
+        size = np.abs(block)
+        # Values that would show as zero, or too wide, switch a column to
+        # scientific notation; the width is only known once trimmed
+        scientific = ((size < 10.0**-digits) & (size > 0)).any(axis=1)
+        cut = None
+    else:
+        scientific, cut = (np.array(a) for a in layouts)
+    out = [None] * len(block)
+    fixed = np.flatnonzero(~scientific)
+    if len(fixed):
+        texts, longest = _fixed_float_text(block[fixed], digits, None if cut is None else cut[fixed])
+        if layouts is None:
+            too_wide = (size[fixed] > 1e6).any(axis=1) & (longest > digits + 6)
+            scientific[fixed[too_wide]] = True
+        for row, text in zip(fixed, texts):
+            out[row] = text
+    for row in np.flatnonzero(scientific):
+        out[row] = [
+            f"{v:.{digits}e}" if np.isfinite(v) else "NaN" if np.isnan(v) else str(v)
+            for v in block[row].tolist()
+        ]
+    return out
+
+
+def _fixed_float_text(block, digits, cut=None):
+    """Fixed-point text of each row of ``block`` and the width of its longest value.
+
+    ``cut`` is the number of trailing zeros to drop per row; by default the
+    zeros all finite values of the row share, keeping one decimal.
+    """
+    finite = np.isfinite(block)
+    text = np.array([f"{v: .{digits}f}" for v in block.ravel().tolist()]).reshape(block.shape)
+    lengths = np.char.str_len(text)
+    if cut is None:
+        zeros = lengths - np.char.str_len(np.char.rstrip(text, "0"))
+        cut = np.minimum(np.where(finite, zeros, digits).min(axis=1), digits - 1)
+        cut[~finite.any(axis=1)] = 0
+
+    # Right-aligned to a common width, the shared zeros are cut off by
+    # casting to a shorter string dtype
+    width = text.dtype.itemsize // np.dtype("U1").itemsize
+    padded = np.char.rjust(text, width)
+    out = np.empty_like(padded)
+    for n in np.unique(cut):
+        rows = cut == n
+        # Rows without finite values are replaced below whatever their cut
+        out[rows] = padded[rows].astype(f"U{max(width - n, 1)}")
+    out = np.char.strip(out)
+    out[np.isnan(block)] = "NaN"
+    out[block == np.inf] = "inf"
+    out[block == -np.inf] = "-inf"
+    longest = np.where(finite, lengths - cut[:, None], 4).max(axis=1, initial=0)
+    return out.tolist(), longest
+
+
+def _float_layout(values):
+    """How ``format_array`` lays out a whole float column, without formatting it.
+
+    Returns ``(scientific, cut)``, as :func:`_format_float_block` takes them
+    in ``layouts``, so that parts of the column formatted separately, such
+    as blocks of rows and the distinct values, read as the column does.
+    None for columns other than NumPy float64 and float32.
+
+    The choices only depend on the set of values, and are found with a
+    few array passes, formatting only values whose rounding is in doubt.
+    """
+    if values.dtype not in (np.float64, np.float32):
+        return None
+    digits = pd.get_option("display.precision")
+    numbers = values.to_numpy(dtype=np.float64)
+    finite = numbers[np.isfinite(numbers)]
+    size = np.abs(finite)
+    if ((size < 10.0**-digits) & (size > 0)).any():
+        return True, 0
+    if not len(finite):
+        return False, 0
+    # Trailing zeros shared at `digits` decimals, from the rounded units;
+    # values rint could round other than the formatted text are checked by
+    # formatting them
+    scaled = size * 10.0**digits
+    units = np.rint(scaled)
+    unsure = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    unsure |= scaled >= 2.0**52
+    cut = 0
+    while cut < digits - 1 and not (np.fmod(units[~unsure], 10.0 ** (cut + 1)) != 0).any():
+        cut += 1
+    if unsure.any():
+        texts = np.array([f"{v:.{digits}f}" for v in finite[unsure].tolist()])
+        zeros = np.char.str_len(texts) - np.char.str_len(np.char.rstrip(texts, "0"))
+        cut = min(cut, int(zeros.min()))
+    widest = finite[np.argmax(size)]
+    longest = len(f"{widest: .{digits}f}") - cut
+    if len(finite) < len(numbers):
+        longest = max(longest, 4)
+    # Infinite values count as large, as in _format_float_block
+    return bool((np.abs(numbers) > 1e6).any() and longest > digits + 6), cut
+
+
+def _missing_ranks(columns, ranks, blocks):
+    """Rank shared by each column's missing values, None for columns without any."""
+    missing = [None] * len(columns)
+    done = set()
+    for indices, block in blocks:
+        done.update(indices)
+        if block.dtype.kind != "f" or block.shape[1] == 0:
+            continue
+        nan = np.isnan(block)
+        first = nan.argmax(axis=1)
+        for i, has, row in zip(indices, nan.any(axis=1), first):
+            if has:
+                missing[i] = int(ranks[i][row])
+    for i, values in enumerate(columns):
+        if i not in done:
+            rows = np.flatnonzero(values.isna().to_numpy())
+            missing[i] = int(ranks[i][rows[0]]) if len(rows) else None
+    return missing
+
+
+def _block_rows(n_cols):
+    """Rows per block fetched by a paged page, about 20000 cells per block."""
+    return max(16, min(256, 20000 // max(1, n_cols)))
+
+
+def _rows_block(df, ids, marks=None, layouts=None):
+    """Cell text of the rows at positions ``ids``, per rendered column.
+
+    Float columns are formatted with their whole column's ``layouts`` when
+    given, see :func:`_format_columns`. With ``marks`` from
+    :func:`_marks_index`, the block also carries the diff marks of its rows,
+    as :func:`_block_marks` returns them.
+    """
+    window = df.iloc[ids]
+    block = {"ids": ids.tolist(), "cells": _format_columns(_rendered_columns(window), layouts=layouts)}
+    if marks is not None:
+        block["marks"] = _block_marks(marks, ids)
+    return block
+
 
-    if sys.platform != "win32":
-        subprocess.Popen(
-            cmd,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            start_new_session=True,
-        ).wait()
+def _marks_index(marks):
+    """Diff marks as arrays for :func:`_block_marks`, or None without row marks."""
+    if marks is None or marks.get("rows") is None:
+        return None
+    cells = [None if pos is None else np.asarray(pos, dtype=np.int64) for pos in marks["cells"]]
+    old = [None if texts is None else np.asarray(texts, dtype=object) for texts in marks["old"]]
+    return {"rows": np.asarray(marks["rows"], dtype=np.int8), "cells": cells, "old": old}
 
 
-def _build_html(df, total_rows):
-    """Build the full HTML page for the DataFrame."""
+def _block_marks(index, ids):
+    """Marks of the rows at positions ``ids``, with positions within the block.
+
+    ``rows`` holds each row's status, and ``cells`` and ``old`` the changed
+    cells and their old text per rendered column, as in the full marks.
+    """
+    cells = []
+    old = []
+    for pos, texts in zip(index["cells"], index["old"]):
+        if pos is None:
+            cells.append(None)
+            old.append(None)
+            continue
+        # Changed positions are sorted; find which of the block's rows they hold
+        at = np.minimum(np.searchsorted(pos, ids), max(len(pos) - 1, 0))
+        hit = np.flatnonzero(pos[at] == ids) if len(pos) else np.array([], dtype=np.int64)
+        cells.append(hit.tolist() if len(hit) else None)
+        old.append(texts[at[hit]].tolist() if len(hit) else None)
+    return {"rows": index["rows"][ids].tolist(), "cells": cells, "old": old}
+
+
+def _frame_payload(df, total_rows, server=False, marks=None, paged=False, session=None):
+    """Data the page renders from: cell text, header labels and sort/filter arrays.
+
+    Cells are listed per rendered column, index levels first. In server mode
+    the typed filter arrays are left out since filters are evaluated in Python.
+    ``marks`` highlights rows and cells of a diff, see :mod:`dfview.diff`.
+
+    A ``paged`` payload holds only the first block of rows; the page asks
+    ``session``, the :class:`~dfview.server.FrameSession` serving the frame,
+    for the others, and for sort orders, filters and value lists, as they
+    are needed. Its size does not depend on the number of rows.
+    """
+    columns = _rendered_columns(df)
+    kinds = [_column_kind(c) for c in columns]
+    payload = {
+        "totalRows": total_rows,
+        "nRows": len(df),
+        "indexLevels": df.index.nlevels,
+        "indexNames": [None if name is None else str(name) for name in df.index.names],
+        "columnNames": [None if name is None else str(name) for name in df.columns.names],
+        "header": [
+            [str(label) for label in df.columns.get_level_values(level)]
+            for level in range(df.columns.nlevels)
+        ],
+        "labels": [_column_label(df, i) for i in range(len(columns))],
+        "kinds": kinds,
+        "marks": marks,
+    }
+    if paged:
+        if session is None:
+            from .server import FrameSession
+
+            session = FrameSession(df, marks)
+        block_rows = _block_rows(len(columns))
+        payload.update(
+            cells=None,
+            ranks=None,
+            missingRanks=None,
+            values=None,
+            # Row and cell highlights travel with each block of rows
+            marks=None if marks is None else {"summary": marks["summary"]},
+            paged=True,
+            blockRows=block_rows,
+            page=session.rows({}, 0, block_rows),
+        )
+        return payload
+    blocks = _dtype_blocks(columns)
+    ranks = _column_ranks(df, columns, blocks)
+    payload.update(
+        cells=_format_columns(columns, blocks),
+        ranks=[r.tolist() for r in ranks],
+        # Rank of the missing cells of each column, None where there are none;
+        # substring and regex filters never match them, as in _filter_mask
+        missingRanks=_missing_ranks(columns, ranks, blocks),
+        values=[None] * len(columns) if server else _filter_values(columns, kinds, blocks),
+    )
+    return payload
+
+
+def _viewer_markup(n_rows, n_cols, server=False, hidden=False):
+    """Empty viewer skeleton; the page script fills in the visible cells."""
+    query_bar = (
+        '<div class="query-bar"><input type="text" '
+        'placeholder="Query, e.g. Salary &gt; 50000 and City == &quot;Koper&quot; (Enter to apply)"></div>'
+        if server
+        else ""
+    )
+    return f"""<div class="dfview"{" hidden" if hidden else ""}>
+    <div class="info">{n_rows} rows &times; {n_cols} columns &nbsp;|&nbsp; <span style="color:#aaa">Alt+drag to select cells</span></div>
+    {query_bar}
+    <div class="grid"><table class="grid-table"><colgroup></colgroup><thead></thead><tbody></tbody></table></div>
+</div>"""
+
+
+def _build_html(df, total_rows, api_url=None, profile=_NO_PROFILE, marks=None, plan=None, session=None):
+    """Build the full HTML page for the DataFrame.
+
+    ``api_url`` is set in server mode; filter conditions are then sent there
+    instead of being evaluated against value arrays embedded in the page.
+    ``plan`` is the ``(strategy, estimate)`` chosen by
+    :func:`dfview.budget.choose_strategy`; the page is static without one.
+    ``session`` is the :class:`~dfview.server.FrameSession` serving the page.
+    """
+    strategy, estimate = plan or ("static", None)
     n_rows, n_cols = df.shape
-    table_html = df.to_html()
+    server = api_url is not None
+    with profile.phase("format"):
+        payload = _frame_payload(df, total_rows, server, marks, paged=strategy == "paged", session=session)
+    with profile.phase("serialize"):
+        payload = _script_json(payload)
+    profile.output("payload", payload)
+    raw_bytes = len(payload)
+    encoding = None
+    if strategy == "compressed":
+        with profile.phase("compress"):
+            payload = base64.b64encode(gzip.compress(payload.encode("utf-8"), compresslevel=1)).decode("ascii")
+        encoding = "gzip"
+    note = None if plan is None else _strategy_note(strategy, estimate, raw_bytes, len(payload))
+    options = _script_json({"apiUrl": api_url, "profile": profile.enabled, "note": note})
+
+    with profile.phase("template"):
+        html = _page_html(n_rows, n_cols, server, payload, options, encoding)
+    profile.output("page", html)
+    return html
+
 
+def _strategy_note(strategy, estimate, raw_bytes, payload_bytes):
+    """Info bar text describing how the frame reached the page."""
+    if strategy == "compressed":
+        return (
+            f"compressed page, {_format_bytes(payload_bytes)} of data "
+            f"({_format_bytes(raw_bytes)} uncompressed)"
+        )
+    if strategy == "paged":
+        if estimate is None:
+            return "rows paged from Python"
+        return f"rows paged from Python; a full page would be ~{_format_bytes(estimate['page_bytes'])}"
+    return f"static page, {_format_bytes(raw_bytes)} of data"
+
+
+def _format_bytes(n):
+    for unit in ("bytes", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "bytes" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _page_html(n_rows, n_cols, server, payload, options, encoding=None):
+    if encoding is None:
+        data = f'<script type="application/json" id="dfview-frame">{payload}</script>'
+    else:
+        data = f'<script type="application/octet-stream" id="dfview-frame" data-encoding="{encoding}">{payload}</script>'
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+{_BODY_STYLE}{_PAGE_STYLE}</style></head><body>
+    {_viewer_markup(n_rows, n_cols, server)}
+    {data}
+    <script>
+{_PAGE_SCRIPT}
+    (function() {{
+        const start = performance.now();
+        const el = document.getElementById('dfview-frame');
+        const options = {options};
+        function mount(text) {{
+            const frame = JSON.parse(text);
+            options.parseMs = performance.now() - start;
+            dfviewMount(document.querySelector('.dfview'), frame, options);
+        }}
+        if (el.dataset.encoding === 'gzip') {{
+            // Base64 of the gzipped payload, inflated by the browser
+            const bin = atob(el.textContent);
+            const bytes = new Uint8Array(bin.length);
+            for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            new Response(stream).text().then(mount);
+        }} else {{
+            mount(el.textContent);
+        }}
+    }})();
+    </script>
+</body></html>"""
+
+
+def _build_bundle_html(items):
+    """Build one page for several frames, given as ``(name, df, total_rows)``.
+
+    Every frame gets a hidden viewer skeleton and its payload in an inert
+    JSON script element, parsed by the switcher when the frame's tab is
+    first selected.
+    """
+    tabs = []
+    viewers = []
+    payloads = []
+    for i, (name, df, total_rows) in enumerate(items):
+        n_rows, n_cols = df.shape
+        tabs.append(
+            f'<button type="button">{_escape(name)} '
+            f'<span class="shape">{n_rows} &times; {n_cols}</span></button>'
+        )
+        viewers.append(_viewer_markup(n_rows, n_cols, hidden=True))
+        payload = _script_json(_frame_payload(df, total_rows))
+        payloads.append(f'<script type="application/json" id="dfview-frame-{i}">{payload}</script>')
+    newline = "\n    "
     return f"""<!DOCTYPE html>
 <html><head><meta charset="utf-8"><style>
-    body {{
+{_BODY_STYLE}{_PAGE_STYLE}{_BUNDLE_STYLE}</style></head><body class="bundle">
+    <div class="frame-tabs">{"".join(tabs)}</div>
+    <div class="frames">
+    {newline.join(viewers)}
+    </div>
+    {newline.join(payloads)}
+    <script>
+{_PAGE_SCRIPT}
+{_BUNDLE_SCRIPT}
+    </script>
+</body></html>"""
+
+
+# Page-level rules; left out when the viewer is embedded in a notebook
+_BODY_STYLE = r"""    html, body {
+        height: 100%;
+    }
+    body {
         font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-        padding: 20px;
+        margin: 0;
         background: #f8f9fa;
-    }}
-    .info {{ color: #666; font-size: 13px; margin-bottom: 10px; }}
-    table {{
+    }
+"""
+
+_PAGE_STYLE = r"""    .dfview {
+        display: flex;
+        flex-direction: column;
+        height: 100%;
+        box-sizing: border-box;
+        padding: 20px;
+    }
+    .dfview .info { color: #666; font-size: 13px; margin-bottom: 10px; }
+    .dfview .query-bar { margin-bottom: 10px; }
+    .dfview .query-bar input {
+        width: 520px;
+        max-width: 100%;
+        box-sizing: border-box;
+        padding: 5px 8px;
+        border: 1px solid #ccc;
+        border-radius: 3px;
+        font-family: SFMono-Regular, Menlo, Consolas, monospace;
+        font-size: 12px;
+    }
+    .dfview .query-bar input:focus {
+        outline: none;
+        border-color: #4a90d9;
+    }
+    .dfview .query-bar input.invalid {
+        border-color: #d9534f;
+    }
+    .dfview .groupby-panel {
+        margin-bottom: 10px;
+        font-size: 13px;
+        color: #444;
+    }
+    .dfview .groupby-panel summary {
+        cursor: pointer;
+        color: #666;
+        user-select: none;
+    }
+    .dfview .groupby-controls {
+        display: flex;
+        align-items: flex-start;
+        gap: 8px;
+        margin: 8px 0;
+    }
+    .dfview .groupby-controls select,
+    .dfview .groupby-controls button {
+        font-size: 12px;
+    }
+    .dfview .groupby-status { color: #888; }
+    .dfview .groupby-result {
+        max-height: 300px;
+        overflow: auto;
+        display: inline-block;
+    }
+    .dfview .groupby-result table {
         border-collapse: collapse;
         background: white;
+        font-size: 12px;
+    }
+    .dfview .groupby-result th,
+    .dfview .groupby-result td {
+        height: 28px;
+        box-sizing: border-box;
+        padding: 4px 10px;
+        border: 1px solid #e9ecef;
+        text-align: right;
+        white-space: nowrap;
+    }
+    .dfview .groupby-result thead th {
+        position: sticky;
+        top: 0;
+        background: #f7f7f9;
+        font-weight: 600;
+    }
+    .dfview .groupby-result tr.spacer td {
+        padding: 0;
+        border: 0;
+    }
+    .dfview .grid {
+        flex: 1;
+        min-height: 0;
+        max-width: 100%;
+        align-self: flex-start;
+        overflow: auto;
+        background: white;
         box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-        font-size: 13px;
+    }
+    .dfview .grid-table {
+        border-collapse: separate;
+        border-spacing: 0;
         table-layout: fixed;
-    }}
-    thead th {{
+        font-size: 13px;
+    }
+    .dfview .grid-table th, .dfview .grid-table td {
+        height: 33px;
+        box-sizing: border-box;
+        padding: 8px 14px;
+        line-height: 16px;
+        border-right: 1px solid #e9ecef;
+        border-bottom: 1px solid #e9ecef;
+        text-align: right;
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+        background: white;
+    }
+    .dfview .grid-table thead th {
         background: #f7f7f9;
         position: sticky;
-        top: 0;
         z-index: 2;
         font-weight: 600;
         border-bottom: 2px solid #dee2e6;
-        overflow: hidden;
-        min-width: 60px;
-        max-width: 300px;
-        position: relative;
         cursor: pointer;
         user-select: none;
-    }}
-    thead th .sort-arrow {{
+    }
+    .dfview .grid-table thead th.group {
+        text-align: center;
+        cursor: default;
+    }
+    .dfview .grid-table thead th.corner {
+        z-index: 3;
+        text-align: left;
+    }
+    .dfview .grid-table tbody th {
+        position: sticky;
+        z-index: 1;
+        text-align: left;
+        font-weight: 500;
+        background: #fafafa;
+    }
+    .dfview .grid-table .spacer {
+        padding: 0;
+        border: 0;
+        background: transparent;
+    }
+    .dfview thead th .sort-arrow {
         font-size: 10px;
         margin-left: 4px;
         color: #999;
-    }}
-    thead th .sort-arrow.active {{
+    }
+    .dfview thead th .sort-arrow.active {
         color: #333;
-    }}
-    .filter-btn {{
+    }
+    .dfview .filter-btn {
         display: inline-block;
         background: none;
         border: 1px solid transparent;
@@ -125,16 +1510,16 @@ def _build_html(df, total_rows):
         padding: 1px 4px;
         margin-left: 2px;
         vertical-align: middle;
-    }}
-    .filter-btn:hover {{
+    }
+    .dfview .filter-btn:hover {
         color: #333;
         background: #e0e0e0;
-    }}
-    .filter-btn.active {{
+    }
+    .dfview .filter-btn.active {
         color: #4a90d9;
         font-weight: bold;
-    }}
-    .filter-dropdown {{
+    }
+    .filter-dropdown {
         position: absolute;
         min-width: 180px;
         max-width: 300px;
@@ -146,9 +1531,10 @@ def _build_html(df, total_rows):
         padding: 8px;
         text-align: left;
         font-weight: normal;
+        font-size: 13px;
         cursor: default;
-    }}
-    .filter-dropdown input[type="text"] {{
+    }
+    .filter-dropdown input[type="text"] {
         width: 100%;
         box-sizing: border-box;
         padding: 4px 6px;
@@ -156,36 +1542,68 @@ def _build_html(df, total_rows):
         border-radius: 3px;
         font-size: 12px;
         margin-bottom: 6px;
-    }}
-    .filter-dropdown input[type="text"]:focus {{
+    }
+    .filter-dropdown input[type="text"]:focus {
         outline: none;
         border-color: #4a90d9;
-    }}
-    .filter-dropdown .checkbox-list {{
+    }
+    .filter-dropdown .condition {
+        display: flex;
+        gap: 4px;
+        margin-bottom: 6px;
+    }
+    .filter-dropdown .condition input[type="text"],
+    .filter-dropdown .condition select {
+        flex: 1;
+        min-width: 0;
+        margin-bottom: 0;
+        font-size: 12px;
+    }
+    .filter-dropdown .condition select {
+        flex: 0 0 auto;
+    }
+    .filter-dropdown input[type="text"].invalid {
+        border-color: #d9534f;
+    }
+    .filter-dropdown .checkbox-list {
+        position: relative;
         max-height: 200px;
         overflow-y: auto;
         border: 1px solid #eee;
         border-radius: 3px;
-        padding: 2px 0;
-    }}
-    .filter-dropdown label {{
+    }
+    .filter-dropdown .checkbox-list .items {
+        position: absolute;
+        left: 0;
+        right: 0;
+    }
+    .filter-dropdown .list-note {
+        color: #999;
+        font-size: 11px;
+        padding-top: 4px;
+    }
+    .filter-dropdown label {
         display: block;
+        box-sizing: border-box;
+        height: 22px;
+        line-height: 16px;
         padding: 3px 6px;
         font-size: 12px;
         cursor: pointer;
         white-space: nowrap;
         overflow: hidden;
         text-overflow: ellipsis;
-    }}
-    .filter-dropdown label:hover {{
+    }
+    .filter-dropdown label:hover {
         background: #f0f4ff;
-    }}
-    .filter-dropdown label.select-all {{
+    }
+    .filter-dropdown label.select-all {
         border-bottom: 1px solid #eee;
         margin-bottom: 2px;
         font-weight: 600;
-    }}
-    .resize-handle {{
+        height: auto;
+    }
+    .dfview .resize-handle {
         position: absolute;
         right: 0;
         top: 0;
@@ -193,162 +1611,590 @@ def _build_html(df, total_rows):
         width: 5px;
         cursor: col-resize;
         background: transparent;
-    }}
-    .resize-handle:hover,
-    .resize-handle.active {{
+    }
+    .dfview .resize-handle:hover,
+    .dfview .resize-handle.active {
         background: #4a90d9;
-    }}
-    th, td {{
-        padding: 8px 14px;
-        border: 1px solid #e9ecef;
-        text-align: right;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-        max-width: 300px;
-    }}
-    td {{
+    }
+    .dfview .grid-table td {
         cursor: pointer;
-    }}
-    td.expanded {{
+    }
+    .dfview .grid-table tbody tr.alt td { background: #f8f9fa; }
+    .dfview .grid-table tbody tr.row-added td { background: #e6ffed; }
+    .dfview .grid-table tbody tr.row-removed td {
+        background: #ffeef0;
+        color: #86181d;
+    }
+    .dfview .grid-table td.cell-changed { background: #fff5b1; }
+    .dfview .grid-table tbody tr:hover td,
+    .dfview .grid-table tbody tr:hover th { background: #e8f4fe; }
+    .dfview .grid-table td.expanded {
         white-space: normal;
         word-break: break-word;
-        background: #fffde7;
-    }}
-    th:first-child, td:first-child {{
-        text-align: left;
-        font-weight: 500;
-        background: #fafafa;
-    }}
-    td:first-child.expanded {{
-        background: #fffde7;
-    }}
-    tbody tr:nth-child(even) {{ background: #f8f9fa; }}
-    tbody tr:hover {{ background: #e8f4fe; }}
-    td.cell-selected, tbody th.cell-selected {{
+        background: #fffde7 !important;
+    }
+    .dfview .grid-table td.cell-selected, .dfview .grid-table tbody th.cell-selected {
         background: #cce5ff !important;
         outline: 1px solid #4a90d9;
         outline-offset: -1px;
-    }}
-    tbody tr:hover td.cell-selected,
-    tbody tr:hover th.cell-selected {{
+    }
+    .dfview .grid-table tbody tr:hover td.cell-selected,
+    .dfview .grid-table tbody tr:hover th.cell-selected {
         background: #b3d7ff !important;
-    }}
-    body.rect-selecting {{
+    }
+    body.rect-selecting {
         cursor: crosshair !important;
         user-select: none;
         -webkit-user-select: none;
-    }}
-    body.rect-selecting td {{
+    }
+    body.rect-selecting td {
         cursor: crosshair !important;
-    }}
-</style></head><body>
-    <div class="info" id="info">{n_rows} rows &times; {n_cols} columns &nbsp;|&nbsp; <span style="color:#aaa">Alt+drag to select cells</span></div>
-    {table_html}
-    <script>
-    (function() {{
-        const table = document.querySelector('table');
+    }
+"""
+
+
+# Renders only the rows and columns in view. ``dfviewMount(root, frame,
+# options)`` attaches a viewer to a ``_viewer_markup`` element and returns an
+# object whose ``destroy()`` detaches its document-level listeners.
+_PAGE_SCRIPT = r"""    function dfviewMount(root, frame, options) {
+        options = options || {};
+        // Set in server mode: conditions, queries and group-bys run in Python
+        const apiUrl = options.apiUrl || null;
+        // Inline notebook views pass their own transport to the kernel
+        const remote = !!(apiUrl || options.send);
+        // Paged frames hold one block of rows; the rest is fetched on demand
+        const paged = !!frame.paged;
+        const grid = root.querySelector('.grid');
+        const table = grid.querySelector('table');
+        const colgroup = table.querySelector('colgroup');
         const thead = table.querySelector('thead');
         const tbody = table.querySelector('tbody');
-        const headerRow = thead.querySelector('tr');
-        const headers = headerRow.querySelectorAll('th');
-        const totalRows = {total_rows};
-        const shownRows = {n_rows};
-        const numCols = {n_cols};
-        const infoEl = document.getElementById('info');
+        const infoEl = root.querySelector('.info');
+        const cells = frame.cells; // cells[col][row]: display text, index levels first
+        const indexLevels = frame.indexLevels;
+        const numCols = frame.labels.length;
+        const lastCol = numCols - 1;
+        const headLevels = frame.header.length;
+        const shownRows = frame.nRows;
+        const dataCols = numCols - indexLevels;
+        const ROW_HEIGHT = 33;
+        const OVERSCAN_ROWS = 6;
+        const OVERSCAN_COLS = 2;
+        // Browsers cap element heights; taller bodies scroll proportionally
+        const MAX_BODY_HEIGHT = 10000000;
+        const HEARTBEAT_MS = 60000;
+
+        // Document-level listeners, removed again by destroy()
+        const listeners = [];
+        function listen(target, type, fn) {
+            target.addEventListener(type, fn);
+            listeners.push([target, type, fn]);
+        }
+
+        // Page timings in ms when profiling, posted back in server mode
+        const timings = options.profile ? { parse: options.parseMs } : null;
+        let timingsPending = false;
+        function recordTiming(name, start) {
+            if (!timings) return;
+            timings[name] = performance.now() - start;
+            if (remote && !timingsPending) {
+                timingsPending = true;
+                setTimeout(() => {
+                    timingsPending = false;
+                    callServer({ op: 'timings', timings: timings }).catch(() => {});
+                }, 500);
+            }
+        }
+
+        // --- Column geometry ---
+        // Widths are estimated from the header and the first rows' text
+        const colWidths = new Array(numCols);
+        for (let c = 0; c < numCols; c++) {
+            let chars = c < indexLevels
+                ? String(frame.indexNames[c] || '').length
+                : Math.max(...frame.header.map(level => level[c - indexLevels].length));
+            const col = paged ? frame.page.cells[c] : cells[c];
+            const sample = Math.min(col.length, 200);
+            for (let r = 0; r < sample; r++) {
+                if (col[r].length > chars) chars = col[r].length;
+            }
+            colWidths[c] = Math.min(300, Math.max(60, Math.round(chars * 7.5) + 28 + 26));
+        }
+        let indexLeft = [];  // sticky offsets of the index columns
+        let indexWidth = 0;
+        let dataLeft = [];   // x offset of each data column after the index
+        let dataWidth = 0;
+
+        function layoutColumns() {
+            indexLeft = [];
+            indexWidth = 0;
+            for (let c = 0; c < indexLevels; c++) {
+                indexLeft.push(indexWidth);
+                indexWidth += colWidths[c];
+            }
+            dataLeft = new Float64Array(dataCols + 1);
+            for (let k = 0; k < dataCols; k++) {
+                dataLeft[k + 1] = dataLeft[k] + colWidths[indexLevels + k];
+            }
+            dataWidth = dataLeft[dataCols];
+            table.style.width = indexWidth + dataWidth + 'px';
+        }
+
+        function firstDataColAt(x) {
+            // Binary search for the data column whose span contains x
+            let lo = 0;
+            let hi = dataCols;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (dataLeft[mid + 1] <= x) lo = mid + 1; else hi = mid;
+            }
+            return lo;
+        }
+
+        // --- Row order: sorting permutes `order`, filtering derives `view` ---
+        let order = paged ? null : new Int32Array(shownRows).map((_, i) => i);
+        let view = order;
+
+        // Paged frames: blocks of the current view, keyed by block number,
+        // each with the original row ids and the cell text of its rows, and
+        // for diffs their row status and the old text of changed cells
+        const blockRows = frame.blockRows;
+        const MAX_BLOCKS = 200;
+        let viewSpec = { sort: [], conditions: [], values: [], query: '' };
+        let viewLength = shownRows;
+        let viewSeq = 0;
+        let blocks = new Map();
+        let pendingBlocks = new Set();
+        if (paged) blocks.set(0, blockEntry(frame.page));
+
+        function rowCount() {
+            return paged ? viewLength : view.length;
+        }
+
+        function rowAt(p) {
+            // Original row shown at view position p, or -1 while not loaded
+            if (!paged) return view[p];
+            const block = blocks.get(Math.floor(p / blockRows));
+            return block ? block.ids[p % blockRows] : -1;
+        }
+
+        function textAt(p, c) {
+            if (!paged) return cells[c][view[p]];
+            return blocks.get(Math.floor(p / blockRows)).cells[c][p % blockRows];
+        }
+
+        function forEachLoadedRow(fn) {
+            // fn(p, r) for every row whose text is at hand, in view order
+            if (!paged) {
+                view.forEach((r, p) => fn(p, r));
+                return;
+            }
+            Array.from(blocks.keys()).sort((a, b) => a - b).forEach(b => {
+                blocks.get(b).ids.forEach((r, k) => fn(b * blockRows + k, r));
+            });
+        }
+
+        function fetchBlock(b) {
+            if (pendingBlocks.has(b)) return;
+            pendingBlocks.add(b);
+            const spec = viewSpec;
+            const pending = pendingBlocks;
+            const start = b * blockRows;
+            callServer({ op: 'rows', view: spec, start: start, stop: start + blockRows }).then(res => {
+                if (spec !== viewSpec) return;
+                pending.delete(b);
+                storeBlock(b, res);
+                scheduleRender();
+            }).catch(err => {
+                pending.delete(b);
+                infoEl.textContent = 'Loading rows failed: ' + err.message;
+            });
+        }
+
+        function blockEntry(res) {
+            const entry = { ids: res.ids, cells: res.cells, rowMarks: null, cellOld: null };
+            if (res.marks) {
+                entry.rowMarks = res.marks.rows;
+                entry.cellOld = res.marks.cells.map((offsets, c) => offsets
+                    ? new Map(offsets.map((k, i) => [k, res.marks.old[c][i]]))
+                    : null);
+            }
+            return entry;
+        }
+
+        function storeBlock(b, res) {
+            // Keep the most recently loaded blocks only
+            if (blocks.size >= MAX_BLOCKS) blocks.delete(blocks.keys().next().value);
+            blocks.set(b, blockEntry(res));
+        }
+
+        function requestView(onError) {
+            // Ask the kernel for the rows matching the current sort and filters
+            const started = performance.now();
+            const values = [];
+            colFilters.forEach((checked, c) => {
+                if (checked !== null) values.push({ col: c, exclude: uniqueCache[c].filter(v => !checked.has(v)) });
+            });
+            const spec = {
+                sort: sortKeys.map(k => [k.col, k.dir === 1]),
+                conditions: colConditions.filter(c => c !== null),
+                values: values,
+                query: queryExpr,
+            };
+            const seq = ++viewSeq;
+            const first = Math.floor(topRow / blockRows);
+            callServer({ op: 'view', view: spec, start: first * blockRows, rows: blockRows }).then(res => {
+                if (seq !== viewSeq) return;
+                viewSpec = spec;
+                viewLength = res.length;
+                blocks = new Map();
+                pendingBlocks = new Set();
+                storeBlock(first, res.page);
+                showCounts();
+                render();
+                recordTiming('view', started);
+            }).catch(err => {
+                if (seq !== viewSeq) return;
+                if (onError) onError(err); else infoEl.textContent = 'Filter failed: ' + err.message;
+            });
+        }
 
         // --- Rectangular selection state ---
+        // Cells are keyed by original row and column: row * numCols + col
+        let selected = new Set();
         let rectSelecting = false;
         let rectStartCell = null;
         let rectEndCell = null;
-        let selectedCells = [];
         let rectMode = 'cell'; // 'cell', 'row', or 'col'
         let rectDidDrag = false;
         let rectDragStartX = 0;
         let rectDragStartY = 0;
-        const lastCol = headers.length - 1;
-
-        // Store original order
-        const rows = Array.from(tbody.querySelectorAll('tr'));
-        rows.forEach((row, i) => row.dataset.origIndex = i);
+        let expanded = null; // {row, col} of the expanded cell
 
         // --- Sort state ---
-        // 0 = original, 1 = ascending, 2 = descending
-        let sortCol = -1;
-        let sortDir = 0;
-
-        function parseValue(text) {{
-            const num = Number(text);
-            return isNaN(num) ? text.toLowerCase() : num;
-        }}
-
-        function sortTable(colIdx, direction) {{
-            const sorted = [...rows];
-            if (direction === 0) {{
-                sorted.sort((a, b) => a.dataset.origIndex - b.dataset.origIndex);
-            }} else {{
-                sorted.sort((a, b) => {{
-                    const aVal = parseValue(a.children[colIdx].textContent.trim());
-                    const bVal = parseValue(b.children[colIdx].textContent.trim());
-                    if (aVal < bVal) return direction === 1 ? -1 : 1;
-                    if (aVal > bVal) return direction === 1 ? 1 : -1;
-                    return 0;
-                }});
-            }}
-            sorted.forEach(row => tbody.appendChild(row));
+        // Ordered list of sort keys, primary first: { col, dir } with
+        // dir 1 = ascending, 2 = descending. Empty = original order.
+        let sortKeys = [];
+        // Dense per-column ranks computed in Python, so multi-column sorts
+        // compare integers instead of re-parsing cell text.
+        const colRanks = paged ? null : frame.ranks.map(r => Int32Array.from(r));
+
+        // Diff highlighting: row status (0 changed, 1 added, 2 removed) and changed cells
+        const marks = frame.marks || null;
+        const ROW_MARK_CLASSES = ['', 'row-added', 'row-removed'];
+        const rowMarks = marks && marks.rows ? Int8Array.from(marks.rows) : null;
+        const cellMarks = marks && marks.cells ? marks.cells.map(positions => {
+            if (!positions) return null;
+            const mask = new Uint8Array(shownRows);
+            positions.forEach(i => { mask[i] = 1; });
+            return mask;
+        }) : null;
+        // Old text of changed cells by row; the cells themselves hold the new values
+        const cellOld = marks && marks.old ? marks.old.map((texts, c) => {
+            if (!texts) return null;
+            const byRow = new Map();
+            marks.cells[c].forEach((r, k) => byRow.set(r, texts[k]));
+            return byRow;
+        }) : null;
+
+        function rowMarkAt(p, r) {
+            if (!paged) return rowMarks ? rowMarks[r] : 0;
+            const block = blocks.get(Math.floor(p / blockRows));
+            return block && block.rowMarks ? block.rowMarks[p % blockRows] : 0;
+        }
+
+        function changedCell(p, r, c) {
+            // Old text of a changed cell (null when unknown), undefined if unchanged
+            if (!paged) {
+                if (!(cellMarks && cellMarks[c] && cellMarks[c][r])) return undefined;
+                return cellOld ? cellOld[c].get(r) : null;
+            }
+            const block = blocks.get(Math.floor(p / blockRows));
+            const old = block && block.cellOld && block.cellOld[c];
+            return old ? old.get(p % blockRows) : undefined;
+        }
+
+        function sortTable() {
+            if (paged) {
+                applyFilters();
+                return;
+            }
+            const started = performance.now();
+            const next = Array.from(order.keys());
+            if (sortKeys.length > 0) {
+                const keys = sortKeys.map(k => ({ ranks: colRanks[k.col], sign: k.dir === 1 ? 1 : -1 }));
+                next.sort((a, b) => {
+                    for (const k of keys) {
+                        const d = k.ranks[a] - k.ranks[b];
+                        if (d !== 0) return k.sign * d;
+                    }
+                    return a - b;
+                });
+            }
+            order = Int32Array.from(next);
             applyFilters();
-            clearSelection();
-        }}
-
-        function updateSortArrows() {{
-            headers.forEach((th, i) => {{
-                const arrow = th.querySelector('.sort-arrow');
-                if (!arrow) return;
-                if (i === sortCol && sortDir === 1) {{
-                    arrow.textContent = ' \\u25B2';
-                    arrow.classList.add('active');
-                }} else if (i === sortCol && sortDir === 2) {{
-                    arrow.textContent = ' \\u25BC';
-                    arrow.classList.add('active');
-                }} else {{
-                    arrow.textContent = '';
-                    arrow.classList.remove('active');
-                }}
-            }});
-        }}
-
-        // --- Filter state: per-column set of checked values ---
-        const colFilters = [];  // colFilters[i] = Set of checked values (null = all)
+            recordTiming('sort', started);
+        }
+
+        function updateSortKeys(colIdx, additive) {
+            const pos = sortKeys.findIndex(k => k.col === colIdx);
+            if (additive) {
+                // Shift-click: add as the next key, or cycle this key in place
+                if (pos === -1) {
+                    sortKeys.push({ col: colIdx, dir: 1 });
+                } else if (sortKeys[pos].dir === 1) {
+                    sortKeys[pos].dir = 2;
+                } else {
+                    sortKeys.splice(pos, 1);
+                }
+            } else if (pos === 0 && sortKeys.length === 1) {
+                if (sortKeys[0].dir === 1) {
+                    sortKeys[0].dir = 2;
+                } else {
+                    sortKeys = [];
+                }
+            } else {
+                sortKeys = [{ col: colIdx, dir: 1 }];
+            }
+        }
+
+        function sortArrowText(colIdx) {
+            const pos = sortKeys.findIndex(k => k.col === colIdx);
+            if (pos === -1) return '';
+            const rank = sortKeys.length > 1 ? String(pos + 1) : '';
+            return (sortKeys[pos].dir === 1 ? ' \u25B2' : ' \u25BC') + rank;
+        }
+
+        // --- Filter state ---
+        const colFilters = new Array(numCols).fill(null);    // Set of checked values (null = all)
+        const colConditions = new Array(numCols).fill(null); // range/contains/regex condition (null = none)
+        const conditionInputs = []; // raw text of the condition inputs, to restore the dropdown
         let openDropdown = null; // currently open dropdown element
         let openDropdownCol = -1; // column index of open dropdown
-
-        function getUniqueValues(colIdx) {{
-            const vals = new Set();
-            rows.forEach(row => {{
-                vals.add(row.children[colIdx].textContent.trim());
-            }});
-            return Array.from(vals).sort((a, b) => {{
-                const na = Number(a), nb = Number(b);
-                if (!isNaN(na) && !isNaN(nb)) return na - nb;
-                return a.localeCompare(b);
-            }});
-        }}
-
-        function closeDropdown() {{
-            if (openDropdown) {{
+        const colKinds = frame.kinds;
+        // Number/date values as typed arrays (dates as epoch ms); static mode only
+        const colValues = paged ? null : frame.values.map(v => v === null ? null : Float64Array.from(v, x => x === null ? NaN : x));
+        let conditionMask = null; // Uint8Array over original rows (null = all pass)
+        let conditionSeq = 0;
+        const uniqueCache = [];
+        const MAX_LIST_ITEMS = 100000;
+        const LIST_ITEM_HEIGHT = 22;
+
+        function getUniqueValues(colIdx) {
+            // Dense ranks give every distinct value its slot in sorted order,
+            // so the list is built in one pass without sorting any text.
+            if (!uniqueCache[colIdx]) {
+                const text = cells[colIdx];
+                const ranks = colRanks[colIdx];
+                let maxRank = 0;
+                for (let r = 0; r < ranks.length; r++) {
+                    if (ranks[r] > maxRank) maxRank = ranks[r];
+                }
+                const slots = new Array(maxRank);
+                for (let r = 0; r < ranks.length; r++) slots[ranks[r] - 1] = text[r];
+                const seen = new Set();
+                slots.forEach(v => { if (v !== undefined) seen.add(v); });
+                uniqueCache[colIdx] = Array.from(seen);
+            }
+            return uniqueCache[colIdx];
+        }
+
+        function callServer(request) {
+            if (options.send) return options.send(request);
+            return fetch(apiUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(request),
+            }).then(r => r.json()).then(res => {
+                if (res.error) throw new Error(res.error);
+                return res;
+            });
+        }
+
+        function decodeMask(packed) {
+            // One bit per row, most significant bit first (np.packbits)
+            const bytes = atob(packed);
+            const mask = new Uint8Array(shownRows);
+            for (let i = 0; i < mask.length; i++) {
+                mask[i] = (bytes.charCodeAt(i >> 3) >> (7 - (i & 7))) & 1;
+            }
+            return mask;
+        }
+
+        function conditionTest(cond) {
+            if (cond.kind === 'range') {
+                const vals = colValues[cond.col];
+                const lo = cond.min === null ? -Infinity : cond.min;
+                const hi = cond.max === null ? Infinity : cond.max;
+                return i => vals[i] >= lo && vals[i] <= hi;
+            }
+            const text = cells[cond.col];
+            // Missing cells show as None/NaN but never match, as in Python
+            const missingRank = frame.missingRanks[cond.col];
+            const ranks = colRanks[cond.col];
+            const present = missingRank === null ? () => true : i => ranks[i] !== missingRank;
+            if (cond.kind === 'regex') {
+                const re = new RegExp(cond.pattern, 'i');
+                return i => present(i) && re.test(text[i]);
+            }
+            const needle = cond.pattern.toLowerCase();
+            return i => present(i) && text[i].toLowerCase().includes(needle);
+        }
+
+        function updateConditionMask() {
+            const started = performance.now();
+            if (paged) {
+                applyFilters();
+                return;
+            }
+            const conds = colConditions.filter(c => c !== null);
+            const seq = ++conditionSeq;
+            if (conds.length === 0) {
+                conditionMask = null;
+                applyFilters();
+                return;
+            }
+            if (apiUrl) {
+                callServer({ op: 'filter', conditions: conds }).then(res => {
+                    if (seq !== conditionSeq) return;
+                    conditionMask = decodeMask(res.mask);
+                    applyFilters();
+                    recordTiming('filter', started);
+                }).catch(err => {
+                    infoEl.textContent = 'Filter failed: ' + err.message;
+                });
+                return;
+            }
+            const tests = conds.map(conditionTest);
+            const mask = new Uint8Array(shownRows);
+            for (let i = 0; i < shownRows; i++) {
+                mask[i] = tests.every(t => t(i)) ? 1 : 0;
+            }
+            conditionMask = mask;
+            applyFilters();
+            recordTiming('filter', started);
+        }
+
+        function parseBound(text, isDate) {
+            text = text.trim();
+            if (text === '') return null;
+            if (!isDate) return Number(text);
+            // Dates without an offset are read as UTC, like the values from Python
+            let iso = text.replace(' ', 'T');
+            if (iso.includes('T') && !/(Z|[+-][0-9][0-9]:?[0-9][0-9])$/.test(iso)) iso += 'Z';
+            return Date.parse(iso);
+        }
+
+        function debounce(fn, ms) {
+            let timer = null;
+            return () => {
+                clearTimeout(timer);
+                timer = setTimeout(fn, ms);
+            };
+        }
+
+        function buildConditionSection(colIdx) {
+            const box = document.createElement('div');
+            box.className = 'condition';
+            const saved = conditionInputs[colIdx] || [];
+            let inputs;
+            let commit;
+            if (colKinds[colIdx] === 'number' || colKinds[colIdx] === 'datetime') {
+                const isDate = colKinds[colIdx] === 'datetime';
+                const lo = document.createElement('input');
+                const hi = document.createElement('input');
+                lo.type = hi.type = 'text';
+                lo.placeholder = isDate ? 'From (YYYY-MM-DD)' : 'Min';
+                hi.placeholder = isDate ? 'To (YYYY-MM-DD)' : 'Max';
+                lo.value = saved[0] || '';
+                hi.value = saved[1] || '';
+                inputs = [lo, hi];
+                commit = () => {
+                    const min = parseBound(lo.value, isDate);
+                    const max = parseBound(hi.value, isDate);
+                    lo.classList.toggle('invalid', Number.isNaN(min));
+                    hi.classList.toggle('invalid', Number.isNaN(max));
+                    if (Number.isNaN(min) || Number.isNaN(max)) return false;
+                    colConditions[colIdx] = min === null && max === null
+                        ? null
+                        : { col: colIdx, kind: 'range', min: min, max: max };
+                    return true;
+                };
+            } else {
+                const mode = document.createElement('select');
+                [['contains', 'Contains'], ['regex', 'Regex']].forEach(([value, label]) => {
+                    const opt = document.createElement('option');
+                    opt.value = value;
+                    opt.textContent = label;
+                    mode.appendChild(opt);
+                });
+                const pattern = document.createElement('input');
+                pattern.type = 'text';
+                pattern.placeholder = 'Match text...';
+                mode.value = saved[0] || 'contains';
+                pattern.value = saved[1] || '';
+                inputs = [mode, pattern];
+                commit = () => {
+                    if (mode.value === 'regex') {
+                        try {
+                            new RegExp(pattern.value, 'i');
+                        } catch (err) {
+                            pattern.classList.add('invalid');
+                            return false;
+                        }
+                    }
+                    pattern.classList.remove('invalid');
+                    colConditions[colIdx] = pattern.value === ''
+                        ? null
+                        : { col: colIdx, kind: mode.value, pattern: pattern.value };
+                    return true;
+                };
+            }
+            const apply = debounce(() => {
+                conditionInputs[colIdx] = inputs.map(el => el.value);
+                if (!commit()) return;
+                updateConditionMask();
+            }, remote ? 250 : 100);
+            inputs.forEach(el => {
+                el.addEventListener('input', apply);
+                box.appendChild(el);
+            });
+            return box;
+        }
+
+        function closeDropdown() {
+            pendingDropdown = -1;
+            if (openDropdown) {
                 openDropdown.remove();
                 openDropdown = null;
                 openDropdownCol = -1;
-            }}
-        }}
+            }
+        }
 
-        function openFilterDropdown(colIdx, th) {{
+        let pendingDropdown = -1;
+
+        function openFilterDropdown(colIdx, th) {
             closeDropdown();
+            if (paged && !uniqueCache[colIdx]) {
+                // The kernel lists the distinct values; open once they arrive
+                pendingDropdown = colIdx;
+                callServer({ op: 'values', col: colIdx }).then(res => {
+                    uniqueCache[colIdx] = res.values;
+                    if (pendingDropdown === colIdx) openFilterDropdown(colIdx, th);
+                }).catch(err => {
+                    infoEl.textContent = 'Loading values failed: ' + err.message;
+                });
+                return;
+            }
+            pendingDropdown = -1;
             const allValues = getUniqueValues(colIdx);
 
             const dd = document.createElement('div');
             dd.className = 'filter-dropdown';
 
+            // Range filter for numbers/dates, substring or regex for text
+            dd.appendChild(buildConditionSection(colIdx));
+
             // Search input
             const search = document.createElement('input');
             search.type = 'text';
@@ -365,71 +2211,97 @@ def _build_html(df, total_rows):
             selectAllLabel.appendChild(document.createTextNode(' Select All'));
             dd.appendChild(selectAllLabel);
 
-            // Checkbox list
+            // Checkbox list, virtualized: only the rows in view are in the DOM
             const listDiv = document.createElement('div');
             listDiv.className = 'checkbox-list';
+            const spacer = document.createElement('div');
+            const itemsDiv = document.createElement('div');
+            itemsDiv.className = 'items';
+            listDiv.appendChild(spacer);
+            listDiv.appendChild(itemsDiv);
             dd.appendChild(listDiv);
+            const note = document.createElement('div');
+            note.className = 'list-note';
+            dd.appendChild(note);
 
-            function renderList(filter) {{
-                listDiv.innerHTML = '';
+            let filtered = allValues;
+
+            function renderWindow() {
                 const cur = colFilters[colIdx];
-                const filtered = filter
-                    ? allValues.filter(v => v.toLowerCase().includes(filter.toLowerCase()))
-                    : allValues;
-                filtered.forEach(val => {{
+                const shown = Math.min(filtered.length, MAX_LIST_ITEMS);
+                const first = Math.floor(listDiv.scrollTop / LIST_ITEM_HEIGHT);
+                const last = Math.min(shown, first + Math.ceil(listDiv.clientHeight / LIST_ITEM_HEIGHT) + 1);
+                itemsDiv.style.top = first * LIST_ITEM_HEIGHT + 'px';
+                itemsDiv.textContent = '';
+                for (let k = first; k < last; k++) {
+                    const val = filtered[k];
                     const lbl = document.createElement('label');
                     const cb = document.createElement('input');
                     cb.type = 'checkbox';
-                    cb.value = val;
                     cb.checked = cur === null || cur.has(val);
-                    cb.addEventListener('change', () => {{
-                        updateCheckedFromList(colIdx, allValues);
-                    }});
+                    cb.addEventListener('change', () => setChecked([val], cb.checked));
                     lbl.appendChild(cb);
                     lbl.appendChild(document.createTextNode(' ' + val));
-                    listDiv.appendChild(lbl);
-                }});
-                // Update Select All state
-                const boxes = listDiv.querySelectorAll('input[type=checkbox]');
-                const allChecked = Array.from(boxes).every(b => b.checked);
-                selectAllCb.checked = allChecked;
-            }}
-
-            function updateCheckedFromList(ci, allVals) {{
-                const boxes = listDiv.querySelectorAll('input[type=checkbox]');
-                const checkedVals = new Set();
-                boxes.forEach(b => {{ if (b.checked) checkedVals.add(b.value); }});
-                // Also keep values not currently visible in the search that were checked
-                const visibleVals = new Set(Array.from(boxes).map(b => b.value));
-                if (colFilters[ci] !== null) {{
-                    colFilters[ci].forEach(v => {{
-                        if (!visibleVals.has(v)) checkedVals.add(v);
-                    }});
-                }} else {{
-                    allVals.forEach(v => {{
-                        if (!visibleVals.has(v)) checkedVals.add(v);
-                    }});
-                }}
-                colFilters[ci] = checkedVals.size === allVals.length ? null : checkedVals;
-                updateFilterBtn(ci);
-                applyFilters();
-                // Update Select All
-                const allChecked = Array.from(boxes).every(b => b.checked);
-                selectAllCb.checked = allChecked;
-            }}
+                    lbl.title = val;
+                    itemsDiv.appendChild(lbl);
+                }
+            }
 
-            selectAllCb.addEventListener('change', () => {{
-                const boxes = listDiv.querySelectorAll('input[type=checkbox]');
-                boxes.forEach(b => {{ b.checked = selectAllCb.checked; }});
-                updateCheckedFromList(colIdx, allValues);
-            }});
+            function updateSelectAll() {
+                const cur = colFilters[colIdx];
+                selectAllCb.checked = cur === null || filtered.every(v => cur.has(v));
+            }
 
-            search.addEventListener('input', () => {{
-                renderList(search.value);
-            }});
+            function renderList(filter) {
+                const needle = filter.toLowerCase();
+                filtered = needle
+                    ? allValues.filter(v => v.toLowerCase().includes(needle))
+                    : allValues;
+                const shown = Math.min(filtered.length, MAX_LIST_ITEMS);
+                spacer.style.height = shown * LIST_ITEM_HEIGHT + 'px';
+                note.textContent = filtered.length > shown
+                    ? 'Showing first ' + shown + ' of ' + filtered.length + ' values'
+                    : '';
+                listDiv.scrollTop = 0;
+                renderWindow();
+                updateSelectAll();
+            }
+
+            function setChecked(vals, checked) {
+                let cur = colFilters[colIdx];
+                if (cur === null) {
+                    if (checked) return;
+                    cur = new Set(allValues);
+                }
+                vals.forEach(v => {
+                    if (checked) cur.add(v); else cur.delete(v);
+                });
+                colFilters[colIdx] = cur.size === allValues.length ? null : cur;
+                const started = performance.now();
+                applyFilters();
+                recordTiming('filter', started);
+                updateSelectAll();
+            }
+
+            selectAllCb.addEventListener('change', () => {
+                setChecked(filtered, selectAllCb.checked);
+                renderWindow();
+            });
+
+            search.addEventListener('input', debounce(() => renderList(search.value), 100));
+
+            let scrollPending = false;
+            listDiv.addEventListener('scroll', () => {
+                if (scrollPending) return;
+                scrollPending = true;
+                requestAnimationFrame(() => {
+                    scrollPending = false;
+                    renderWindow();
+                });
+            });
 
-            renderList('');
             document.body.appendChild(dd);
+            renderList('');
             const rect = th.getBoundingClientRect();
             dd.style.left = rect.left + window.scrollX + 'px';
             dd.style.top = rect.bottom + window.scrollY + 'px';
@@ -440,137 +2312,563 @@ def _build_html(df, total_rows):
             // Prevent clicks inside dropdown from triggering sort
             dd.addEventListener('click', e => e.stopPropagation());
             dd.addEventListener('mousedown', e => e.stopPropagation());
-        }}
-
-        function updateFilterBtn(colIdx) {{
-            const btn = headers[colIdx].querySelector('.filter-btn');
-            if (!btn) return;
-            if (colFilters[colIdx] === null) {{
-                btn.classList.remove('active');
-            }} else {{
-                btn.classList.add('active');
-            }}
-        }}
-
-        // Add sort arrows, filter buttons, and click handlers to headers
-        headers.forEach((th, i) => {{
-            colFilters.push(null); // null = all values selected
-
+        }
+
+        // --- Query bar (server mode): DataFrame.query evaluated in Python ---
+        let queryMask = null; // Uint8Array over original rows (null = no query)
+        let queryExpr = ''; // the applied query, sent with paged view requests
+        let querySeq = 0;
+        const queryInput = root.querySelector('.query-bar input');
+
+        function runQuery(expr) {
+            const started = performance.now();
+            const seq = ++querySeq;
+            queryInput.classList.remove('invalid');
+            queryInput.title = '';
+            if (paged) {
+                const previous = queryExpr;
+                queryExpr = expr;
+                requestView(err => {
+                    queryExpr = previous;
+                    queryInput.classList.add('invalid');
+                    queryInput.title = err.message;
+                    infoEl.textContent = 'Query failed: ' + err.message;
+                });
+                return;
+            }
+            if (expr === '') {
+                queryMask = null;
+                applyFilters();
+                return;
+            }
+            callServer({ op: 'query', expr: expr }).then(res => {
+                if (seq !== querySeq) return;
+                queryMask = decodeMask(res.mask);
+                applyFilters();
+                recordTiming('query', started);
+            }).catch(err => {
+                if (seq !== querySeq) return;
+                queryInput.classList.add('invalid');
+                queryInput.title = err.message;
+                infoEl.textContent = 'Query failed: ' + err.message;
+            });
+        }
+
+        if (queryInput) {
+            queryInput.addEventListener('keydown', e => {
+                if (e.key === 'Enter') runQuery(queryInput.value.trim());
+            });
+        }
+
+        // --- Group-by panel (server mode): aggregated by pandas in Python ---
+        const GROUP_ROW_HEIGHT = 28;
+
+        function packVisibleRows() {
+            // Base64 bitmask of the rows shown now, or null when none are hidden
+            if (view.length === shownRows) return null;
+            const bytes = new Uint8Array((shownRows + 7) >> 3);
+            view.forEach(i => { bytes[i >> 3] |= 0x80 >> (i & 7); });
+            let bin = '';
+            for (let k = 0; k < bytes.length; k += 8192) {
+                bin += String.fromCharCode.apply(null, bytes.subarray(k, k + 8192));
+            }
+            return btoa(bin);
+        }
+
+        function renderGroupResult(resultDiv, res) {
+            resultDiv.textContent = '';
+            const resultTable = document.createElement('table');
+            const head = document.createElement('thead');
+            const headRow = document.createElement('tr');
+            res.columns.forEach(name => {
+                const th = document.createElement('th');
+                th.textContent = name;
+                headRow.appendChild(th);
+            });
+            head.appendChild(headRow);
+            const body = document.createElement('tbody');
+            resultTable.appendChild(head);
+            resultTable.appendChild(body);
+            resultDiv.appendChild(resultTable);
+
+            function spacer(height) {
+                const tr = document.createElement('tr');
+                tr.className = 'spacer';
+                const td = document.createElement('td');
+                td.colSpan = res.columns.length;
+                td.style.height = height + 'px';
+                tr.appendChild(td);
+                return tr;
+            }
+
+            // Only the rows in view (plus a small margin) are in the DOM
+            function renderRows() {
+                const first = Math.max(0, Math.floor(resultDiv.scrollTop / GROUP_ROW_HEIGHT) - 5);
+                const last = Math.min(res.rows.length, first + Math.ceil(resultDiv.clientHeight / GROUP_ROW_HEIGHT) + 10);
+                const frag = document.createDocumentFragment();
+                if (first > 0) frag.appendChild(spacer(first * GROUP_ROW_HEIGHT));
+                for (let r = first; r < last; r++) {
+                    const tr = document.createElement('tr');
+                    res.rows[r].forEach(v => {
+                        const td = document.createElement('td');
+                        td.textContent = v === null ? '' : String(v);
+                        tr.appendChild(td);
+                    });
+                    frag.appendChild(tr);
+                }
+                if (last < res.rows.length) frag.appendChild(spacer((res.rows.length - last) * GROUP_ROW_HEIGHT));
+                body.textContent = '';
+                body.appendChild(frag);
+            }
+
+            let scrollPending = false;
+            resultDiv.onscroll = () => {
+                if (scrollPending) return;
+                scrollPending = true;
+                requestAnimationFrame(() => {
+                    scrollPending = false;
+                    renderRows();
+                });
+            };
+            resultDiv.scrollTop = 0;
+            renderRows();
+        }
+
+        function buildGroupPanel() {
+            const panel = document.createElement('details');
+            panel.className = 'groupby-panel';
+            const summary = document.createElement('summary');
+            summary.textContent = 'Group by';
+            panel.appendChild(summary);
+
+            function makeSelect(options) {
+                const sel = document.createElement('select');
+                options.forEach(([value, label]) => {
+                    const opt = document.createElement('option');
+                    opt.value = value;
+                    opt.textContent = label;
+                    sel.appendChild(opt);
+                });
+                return sel;
+            }
+
+            const columnOptions = frame.labels.map((name, i) => [String(i), name]);
+            const keySel = makeSelect(columnOptions);
+            keySel.multiple = true;
+            keySel.size = Math.min(6, columnOptions.length);
+            keySel.title = 'Ctrl/Cmd+click to group by several columns';
+            const aggSel = makeSelect([
+                ['size', 'row count'], ['count', 'count'], ['sum', 'sum'], ['mean', 'mean'],
+                ['min', 'min'], ['max', 'max'], ['median', 'median'], ['std', 'std'],
+                ['nunique', 'distinct count'],
+            ]);
+            const valSel = makeSelect(columnOptions);
+            valSel.disabled = true;
+            aggSel.addEventListener('change', () => { valSel.disabled = aggSel.value === 'size'; });
+            const runBtn = document.createElement('button');
+            runBtn.textContent = 'Run';
+            const status = document.createElement('span');
+            status.className = 'groupby-status';
+
+            const controls = document.createElement('div');
+            controls.className = 'groupby-controls';
+            [keySel, document.createTextNode('aggregate'), aggSel, document.createTextNode('of'), valSel, runBtn, status]
+                .forEach(el => controls.appendChild(el));
+            panel.appendChild(controls);
+            const resultDiv = document.createElement('div');
+            resultDiv.className = 'groupby-result';
+            panel.appendChild(resultDiv);
+
+            let seq = 0;
+            runBtn.addEventListener('click', () => {
+                const keys = Array.from(keySel.selectedOptions).map(o => Number(o.value));
+                if (keys.length === 0) {
+                    status.textContent = 'Pick at least one column to group by';
+                    return;
+                }
+                const request = {
+                    op: 'groupby',
+                    keys: keys,
+                    values: aggSel.value === 'size' ? [] : [Number(valSel.value)],
+                    agg: aggSel.value,
+                };
+                // Paged views are known to the kernel; others send their rows
+                if (paged) request.view = viewSpec; else request.mask = packVisibleRows();
+                const filtered = rowCount() !== shownRows;
+                const mySeq = ++seq;
+                status.textContent = 'Running...';
+                callServer(request).then(res => {
+                    if (mySeq !== seq) return;
+                    status.textContent = res.rows.length + ' group' + (res.rows.length === 1 ? '' : 's')
+                        + (filtered ? ' (filtered rows)' : '');
+                    renderGroupResult(resultDiv, res);
+                }).catch(err => {
+                    if (mySeq !== seq) return;
+                    status.textContent = 'Group by failed: ' + err.message;
+                });
+            });
+            return panel;
+        }
+
+        if (remote) {
+            root.insertBefore(buildGroupPanel(), grid);
+        }
+
+        function applyFilters() {
+            clearSelection();
+            if (paged) {
+                requestView();
+                return;
+            }
+            const active = [];
+            colFilters.forEach((checked, c) => {
+                if (checked !== null) active.push([cells[c], checked]);
+            });
+            const next = [];
+            for (let k = 0; k < order.length; k++) {
+                const i = order[k];
+                let match = (conditionMask === null || conditionMask[i] === 1)
+                    && (queryMask === null || queryMask[i] === 1);
+                for (let a = 0; match && a < active.length; a++) {
+                    if (!active[a][1].has(active[a][0][i])) match = false;
+                }
+                if (match) next.push(i);
+            }
+            view = next.length === order.length ? order : Int32Array.from(next);
+            showCounts();
+            render();
+        }
+
+        function showCounts() {
+            const n = rowCount();
+            if (n === shownRows) {
+                infoEl.textContent = shownRows + ' rows \u00D7 ' + dataCols + ' columns';
+            } else {
+                infoEl.textContent = 'Showing ' + n + ' of ' + shownRows + ' rows \u00D7 ' + dataCols + ' columns';
+            }
+            if (marks) infoEl.textContent += ' | ' + marks.summary;
+            if (options.note) infoEl.textContent += ' | ' + options.note;
+        }
+
+        // --- Rendering: only the rows and columns in view are in the DOM ---
+        let renderPending = false;
+        let topRow = 0; // first fully visible view position, for index sparsifying
+
+        function scheduleRender() {
+            if (renderPending) return;
+            renderPending = true;
+            requestAnimationFrame(() => {
+                renderPending = false;
+                render();
+            });
+        }
+
+        function headerCell(tag, colIdx, level) {
+            const th = document.createElement(tag);
+            th.style.top = level * ROW_HEIGHT + 'px';
+            if (colIdx < indexLevels) {
+                th.className = 'corner';
+                th.style.left = indexLeft[colIdx] + 'px';
+            }
+            return th;
+        }
+
+        function addHeaderControls(th, colIdx) {
+            th.dataset.col = colIdx;
             const arrow = document.createElement('span');
             arrow.className = 'sort-arrow';
+            arrow.textContent = sortArrowText(colIdx);
+            if (arrow.textContent) arrow.classList.add('active');
             th.appendChild(arrow);
-
-            // Filter button
             const filterBtn = document.createElement('span');
             filterBtn.className = 'filter-btn';
-            filterBtn.textContent = '\\u25BC';
+            if (colFilters[colIdx] !== null || colConditions[colIdx] !== null) filterBtn.classList.add('active');
+            filterBtn.textContent = '\u25BC';
             filterBtn.title = 'Filter';
-            filterBtn.addEventListener('click', (e) => {{
-                e.stopPropagation();
-                if (openDropdown && openDropdownCol === i) {{
-                    closeDropdown();
-                }} else {{
-                    openFilterDropdown(i, th);
-                }}
-            }});
             th.appendChild(filterBtn);
-
-            // Add resize handle
             const handle = document.createElement('div');
             handle.className = 'resize-handle';
             th.appendChild(handle);
-
-            th.addEventListener('mousedown', (e) => {{
-                if (!e.altKey) return;
-                if (e.target.classList.contains('resize-handle')) return;
-                if (e.target.classList.contains('filter-btn')) return;
-                e.preventDefault();
-                e.stopPropagation();
-                toggleColumn(th.cellIndex);
-            }});
-
-            th.addEventListener('click', (e) => {{
-                if (e.altKey) return;
-                if (e.target.classList.contains('resize-handle')) return;
-                if (e.target.classList.contains('filter-btn')) return;
-                if (sortCol === i) {{
-                    sortDir = (sortDir + 1) % 3;
-                }} else {{
-                    sortCol = i;
-                    sortDir = 1;
-                }}
-                updateSortArrows();
-                sortTable(i, sortDir);
-            }});
-
-            // Column resize
-            let startX, startW;
-            handle.addEventListener('mousedown', e => {{
-                e.preventDefault();
+        }
+
+        function spacerCell(tag, width) {
+            const cell = document.createElement(tag);
+            cell.className = 'spacer';
+            cell.style.width = width + 'px';
+            return cell;
+        }
+
+        function render() {
+            const headHeight = headLevels * ROW_HEIGHT;
+            const bodyViewHeight = Math.max(ROW_HEIGHT, grid.clientHeight - headHeight);
+            const nRows = rowCount();
+            const bodyHeight = Math.min(nRows * ROW_HEIGHT, MAX_BODY_HEIGHT);
+
+            // Rows: map the scroll position to a fractional view position
+            const scrollTop = Math.min(grid.scrollTop, Math.max(0, bodyHeight - bodyViewHeight));
+            const exact = bodyHeight === nRows * ROW_HEIGHT
+                ? scrollTop / ROW_HEIGHT
+                : scrollTop / Math.max(1, bodyHeight - bodyViewHeight) * Math.max(0, nRows - bodyViewHeight / ROW_HEIGHT);
+            topRow = Math.floor(exact);
+            let firstRow = Math.max(0, topRow - OVERSCAN_ROWS);
+            const lastRow = Math.min(nRows, Math.ceil(exact + bodyViewHeight / ROW_HEIGHT) + OVERSCAN_ROWS);
+            let topSpace = scrollTop - (exact - firstRow) * ROW_HEIGHT;
+            while (topSpace < 0 && firstRow < topRow) {
+                firstRow++;
+                topSpace += ROW_HEIGHT;
+            }
+            topSpace = Math.max(0, topSpace);
+            const bottomSpace = Math.max(0, bodyHeight - topSpace - (lastRow - firstRow) * ROW_HEIGHT);
+
+            // Columns: data columns overlapping the area right of the sticky index
+            const viewLeft = grid.scrollLeft;
+            const viewRight = viewLeft + Math.max(0, grid.clientWidth - indexWidth);
+            const colStart = Math.max(0, firstDataColAt(viewLeft) - OVERSCAN_COLS);
+            const colEnd = Math.min(dataCols, firstDataColAt(viewRight) + 1 + OVERSCAN_COLS);
+            const leftSpace = dataLeft[colStart];
+            const rightSpace = dataWidth - dataLeft[colEnd];
+
+            colgroup.textContent = '';
+            const addCol = width => {
+                const col = document.createElement('col');
+                col.style.width = width + 'px';
+                colgroup.appendChild(col);
+            };
+            for (let c = 0; c < indexLevels; c++) addCol(colWidths[c]);
+            addCol(leftSpace);
+            for (let k = colStart; k < colEnd; k++) addCol(colWidths[indexLevels + k]);
+            addCol(rightSpace);
+
+            // Header: one row per column level, adjacent equal labels merged
+            const headFrag = document.createDocumentFragment();
+            for (let level = 0; level < headLevels; level++) {
+                const tr = document.createElement('tr');
+                const bottom = level === headLevels - 1;
+                for (let c = 0; c < indexLevels; c++) {
+                    const th = headerCell('th', c, level);
+                    if (bottom) {
+                        th.textContent = frame.indexNames[c] || '';
+                        addHeaderControls(th, c);
+                    } else if (c === indexLevels - 1) {
+                        th.textContent = frame.columnNames[level] || '';
+                    }
+                    tr.appendChild(th);
+                }
+                const left = spacerCell('th', leftSpace);
+                left.style.top = level * ROW_HEIGHT + 'px';
+                tr.appendChild(left);
+                let k = colStart;
+                while (k < colEnd) {
+                    const th = headerCell('th', indexLevels + k, level);
+                    th.textContent = frame.header[level][k];
+                    if (bottom) {
+                        addHeaderControls(th, indexLevels + k);
+                        k++;
+                    } else {
+                        let span = 1;
+                        while (k + span < colEnd && sameHeaderGroup(k, k + span, level)) span++;
+                        th.colSpan = span;
+                        th.classList.add('group');
+                        k += span;
+                    }
+                    tr.appendChild(th);
+                }
+                const right = spacerCell('th', rightSpace);
+                right.style.top = level * ROW_HEIGHT + 'px';
+                tr.appendChild(right);
+                headFrag.appendChild(tr);
+            }
+            thead.textContent = '';
+            thead.appendChild(headFrag);
+
+            // Body
+            const bodyFrag = document.createDocumentFragment();
+            const spanAll = indexLevels + colEnd - colStart + 2;
+            const spacerRow = height => {
+                const tr = document.createElement('tr');
+                const td = document.createElement('td');
+                td.className = 'spacer';
+                td.colSpan = spanAll;
+                td.style.height = height + 'px';
+                tr.appendChild(td);
+                return tr;
+            };
+            if (topSpace > 0) bodyFrag.appendChild(spacerRow(topSpace));
+            for (let p = firstRow; p < lastRow; p++) {
+                const r = rowAt(p);
+                const tr = document.createElement('tr');
+                if (p % 2 === 1) tr.className = 'alt';
+                if (r === -1) {
+                    // Not loaded yet: an empty row until its block arrives
+                    fetchBlock(Math.floor(p / blockRows));
+                    tr.classList.add('loading');
+                    for (let c = 0; c < indexLevels; c++) {
+                        const th = document.createElement('th');
+                        th.style.left = indexLeft[c] + 'px';
+                        tr.appendChild(th);
+                    }
+                    const td = document.createElement('td');
+                    td.colSpan = colEnd - colStart + 2;
+                    tr.appendChild(td);
+                    bodyFrag.appendChild(tr);
+                    continue;
+                }
+                const rowMark = rowMarkAt(p, r);
+                if (rowMark) tr.classList.add(ROW_MARK_CLASSES[rowMark]);
+                for (let c = 0; c < indexLevels; c++) {
+                    const th = document.createElement('th');
+                    th.style.left = indexLeft[c] + 'px';
+                    // Repeated outer index labels are left blank, like to_html
+                    if (!(c < indexLevels - 1 && p > topRow && sameIndexPrefix(p, p - 1, c))) {
+                        th.textContent = textAt(p, c);
+                    }
+                    decorateCell(th, p, r, c);
+                    tr.appendChild(th);
+                }
+                tr.appendChild(spacerCell('td', leftSpace));
+                for (let k = colStart; k < colEnd; k++) {
+                    const c = indexLevels + k;
+                    const td = document.createElement('td');
+                    td.textContent = textAt(p, c);
+                    decorateCell(td, p, r, c);
+                    tr.appendChild(td);
+                }
+                tr.appendChild(spacerCell('td', rightSpace));
+                bodyFrag.appendChild(tr);
+            }
+            if (bottomSpace > 0) bodyFrag.appendChild(spacerRow(bottomSpace));
+            tbody.textContent = '';
+            tbody.appendChild(bodyFrag);
+        }
+
+        function sameHeaderGroup(a, b, level) {
+            for (let l = 0; l <= level; l++) {
+                if (frame.header[l][a] !== frame.header[l][b]) return false;
+            }
+            return true;
+        }
+
+        function sameIndexPrefix(p, q, level) {
+            // Whether view positions p and q share the index labels up to level
+            if (paged && rowAt(q) === -1) return false;
+            for (let l = 0; l <= level; l++) {
+                if (paged ? textAt(p, l) !== textAt(q, l) : colRanks[l][view[p]] !== colRanks[l][view[q]]) return false;
+            }
+            return true;
+        }
+
+        function decorateCell(cell, p, r, c) {
+            cell.dataset.p = p;
+            cell.dataset.c = c;
+            const old = changedCell(p, r, c);
+            if (old !== undefined) {
+                cell.classList.add('cell-changed');
+                if (old !== null) cell.textContent = old + ' → ' + cell.textContent;
+            }
+            if (selected.has(r * numCols + c)) cell.classList.add('cell-selected');
+            if (expanded && expanded.row === r && expanded.col === c) cell.classList.add('expanded');
+        }
+
+        listen(grid, 'scroll', scheduleRender);
+        listen(window, 'resize', scheduleRender);
+
+        // --- Header interaction (delegated, header cells are re-rendered) ---
+        thead.addEventListener('mousedown', (e) => {
+            const th = e.target.closest('th[data-col]');
+            if (!th) return;
+            const colIdx = Number(th.dataset.col);
+            if (e.target.classList.contains('resize-handle')) {
+                startResize(e, colIdx);
+                return;
+            }
+            if (!e.altKey) return;
+            if (e.target.classList.contains('filter-btn')) return;
+            e.preventDefault();
+            e.stopPropagation();
+            toggleColumn(colIdx);
+        });
+
+        thead.addEventListener('click', (e) => {
+            const th = e.target.closest('th[data-col]');
+            if (!th) return;
+            const colIdx = Number(th.dataset.col);
+            if (e.target.classList.contains('filter-btn')) {
                 e.stopPropagation();
-                startX = e.pageX;
-                startW = th.offsetWidth;
-                handle.classList.add('active');
-
-                const onMouseMove = e => {{
-                    const newWidth = Math.max(60, startW + e.pageX - startX);
-                    th.style.width = newWidth + 'px';
-                    th.style.maxWidth = newWidth + 'px';
-                    const idx = th.cellIndex;
-                    document.querySelectorAll(`tbody td:nth-child(${{idx + 1}})`).forEach(td => {{
-                        td.style.width = newWidth + 'px';
-                        td.style.maxWidth = newWidth + 'px';
-                    }});
-                }};
-
-                const onMouseUp = () => {{
-                    handle.classList.remove('active');
-                    document.removeEventListener('mousemove', onMouseMove);
-                    document.removeEventListener('mouseup', onMouseUp);
-                }};
-
-                document.addEventListener('mousemove', onMouseMove);
-                document.addEventListener('mouseup', onMouseUp);
-            }});
-        }});
+                if (openDropdown && openDropdownCol === colIdx) {
+                    closeDropdown();
+                } else {
+                    openFilterDropdown(colIdx, th);
+                }
+                return;
+            }
+            if (e.altKey) return;
+            if (e.target.classList.contains('resize-handle')) return;
+            updateSortKeys(colIdx, e.shiftKey);
+            sortTable();
+        });
+
+        // Column resize
+        function startResize(e, colIdx) {
+            e.preventDefault();
+            e.stopPropagation();
+            const startX = e.pageX;
+            const startW = colWidths[colIdx];
+            e.target.classList.add('active');
+
+            const onMouseMove = e => {
+                colWidths[colIdx] = Math.max(60, startW + e.pageX - startX);
+                layoutColumns();
+                scheduleRender();
+            };
+
+            const onMouseUp = () => {
+                document.removeEventListener('mousemove', onMouseMove);
+                document.removeEventListener('mouseup', onMouseUp);
+            };
+
+            document.addEventListener('mousemove', onMouseMove);
+            document.addEventListener('mouseup', onMouseUp);
+        }
 
         // Close dropdown on outside click or Escape
-        document.addEventListener('click', (e) => {{
-            if (openDropdown && !openDropdown.contains(e.target) && !e.target.classList.contains('filter-btn')) {{
+        listen(document, 'click', (e) => {
+            if (openDropdown && !openDropdown.contains(e.target) && !e.target.classList.contains('filter-btn')) {
                 closeDropdown();
-            }}
-        }});
-        document.addEventListener('keydown', (e) => {{
-            if (e.key === 'Escape') {{
+            }
+        });
+        listen(document, 'keydown', (e) => {
+            // Frames in other tabs of a bundle page stay inactive
+            if (root.hidden) return;
+            if (e.key === 'Escape') {
                 closeDropdown();
                 clearSelection();
                 return;
-            }}
+            }
             // Copy selected cells (rectangular or non-adjacent)
-            if ((e.ctrlKey || e.metaKey) && e.key === 'c' && selectedCells.length > 0) {{
+            if ((e.ctrlKey || e.metaKey) && e.key === 'c' && selected.size > 0) {
                 e.preventDefault();
-                const visibleRows = getVisibleRows();
                 const rowMap = new Map();
-                selectedCells.forEach(cell => {{
-                    const rIdx = visibleRows.indexOf(cell.parentElement);
-                    const cIdx = cell.cellIndex;
-                    if (!rowMap.has(rIdx)) rowMap.set(rIdx, []);
-                    rowMap.get(rIdx).push(cIdx);
-                }});
-                const sortedRowKeys = Array.from(rowMap.keys()).sort((a, b) => a - b);
-                const lines = sortedRowKeys.map(rIdx => {{
-                    const tr = visibleRows[rIdx];
-                    const cols = rowMap.get(rIdx).sort((a, b) => a - b);
-                    return cols.map(c => tr.children[c].textContent.trim()).join('\\t');
-                }});
-                const text = lines.join('\\n');
-                const showCopied = () => {{
+                selected.forEach(key => {
+                    const r = Math.floor(key / numCols);
+                    if (!rowMap.has(r)) rowMap.set(r, []);
+                    rowMap.get(r).push(key - r * numCols);
+                });
+                const lines = [];
+                let count = 0;
+                forEachLoadedRow((p, r) => {
+                    const cols = rowMap.get(r);
+                    if (!cols) return;
+                    cols.sort((a, b) => a - b);
+                    lines.push(cols.map(c => textAt(p, c)).join('\t'));
+                    count += cols.length;
+                });
+                const text = lines.join('\n');
+                const showCopied = () => {
                     const orig = infoEl.textContent;
-                    const count = selectedCells.length;
                     infoEl.textContent = 'Copied ' + count + ' cell' + (count > 1 ? 's' : '') + ' to clipboard';
-                    setTimeout(() => {{ infoEl.textContent = orig; }}, 1500);
-                }};
-                navigator.clipboard.writeText(text).then(showCopied).catch(() => {{
+                    setTimeout(() => { infoEl.textContent = orig; }, 1500);
+                };
+                navigator.clipboard.writeText(text).then(showCopied).catch(() => {
                     const ta = document.createElement('textarea');
                     ta.value = text;
                     ta.style.position = 'fixed';
@@ -580,119 +2878,65 @@ def _build_html(df, total_rows):
                     document.execCommand('copy');
                     document.body.removeChild(ta);
                     showCopied();
-                }});
-            }}
-        }});
-
-        function applyFilters() {{
-            clearSelection();
-            let visibleCount = 0;
-            const currentRows = Array.from(tbody.querySelectorAll('tr'));
-
-            currentRows.forEach(row => {{
-                const cells = row.children;
-                let match = true;
-                for (let i = 0; i < cells.length; i++) {{
-                    if (colFilters[i] !== null && !colFilters[i].has(cells[i].textContent.trim())) {{
-                        match = false;
-                        break;
-                    }}
-                }}
-                row.style.display = match ? '' : 'none';
-                if (match) visibleCount++;
-            }});
-
-            if (visibleCount === shownRows) {{
-                infoEl.textContent = shownRows + ' rows \\u00D7 ' + numCols + ' columns';
-            }} else {{
-                infoEl.textContent = 'Showing ' + visibleCount + ' of ' + shownRows + ' rows \\u00D7 ' + numCols + ' columns';
-            }}
-        }}
+                });
+            }
+        });
 
         // --- Rectangular selection helpers ---
-        function getVisibleRows() {{
-            return Array.from(tbody.querySelectorAll('tr')).filter(
-                r => r.style.display !== 'none'
-            );
-        }}
-
-        function getCellCoords(td) {{
-            return {{ row: td.parentElement, col: td.cellIndex }};
-        }}
-
-        function clearSelection() {{
-            selectedCells.forEach(td => td.classList.remove('cell-selected'));
-            selectedCells = [];
-        }}
-
-        function highlightRect(startCoords, endCoords) {{
-            clearSelection();
-            const visibleRows = getVisibleRows();
-            const startIdx = visibleRows.indexOf(startCoords.row);
-            const endIdx = visibleRows.indexOf(endCoords.row);
-            if (startIdx === -1 || endIdx === -1) return;
-            const rowMin = Math.min(startIdx, endIdx);
-            const rowMax = Math.max(startIdx, endIdx);
+        function getCellCoords(cell) {
+            return { p: Number(cell.dataset.p), col: Number(cell.dataset.c) };
+        }
+
+        function clearSelection() {
+            if (selected.size === 0) return;
+            selected = new Set();
+            scheduleRender();
+        }
+
+        function highlightRect(startCoords, endCoords) {
+            selected = new Set();
+            const rowMin = Math.min(startCoords.p, endCoords.p);
+            const rowMax = Math.max(startCoords.p, endCoords.p);
             let colMin = Math.min(startCoords.col, endCoords.col);
             let colMax = Math.max(startCoords.col, endCoords.col);
-            if (rectMode === 'row') {{ colMin = 0; colMax = lastCol; }}
-            for (let r = rowMin; r <= rowMax; r++) {{
-                const tr = visibleRows[r];
-                for (let c = colMin; c <= colMax; c++) {{
-                    const td = tr.children[c];
-                    if (td) {{
-                        td.classList.add('cell-selected');
-                        selectedCells.push(td);
-                    }}
-                }}
-            }}
-        }}
-
-        function toggleCell(coords) {{
-            const td = coords.row.children[coords.col];
-            if (!td) return;
-            if (td.classList.contains('cell-selected')) {{
-                td.classList.remove('cell-selected');
-                selectedCells = selectedCells.filter(c => c !== td);
-            }} else {{
-                td.classList.add('cell-selected');
-                selectedCells.push(td);
-            }}
-        }}
-
-        function toggleRow(tr) {{
-            const cells = Array.from(tr.children);
-            const allSelected = cells.every(c => c.classList.contains('cell-selected'));
-            cells.forEach(c => {{
-                if (allSelected) {{
-                    c.classList.remove('cell-selected');
-                    selectedCells = selectedCells.filter(s => s !== c);
-                }} else if (!c.classList.contains('cell-selected')) {{
-                    c.classList.add('cell-selected');
-                    selectedCells.push(c);
-                }}
-            }});
-        }}
-
-        function toggleColumn(colIdx) {{
-            const cells = getVisibleRows().map(tr => tr.children[colIdx]).filter(Boolean);
-            const allSelected = cells.every(c => c.classList.contains('cell-selected'));
-            cells.forEach(c => {{
-                if (allSelected) {{
-                    c.classList.remove('cell-selected');
-                    selectedCells = selectedCells.filter(s => s !== c);
-                }} else if (!c.classList.contains('cell-selected')) {{
-                    c.classList.add('cell-selected');
-                    selectedCells.push(c);
-                }}
-            }});
-        }}
+            if (rectMode === 'row') { colMin = 0; colMax = lastCol; }
+            for (let p = rowMin; p <= rowMax; p++) {
+                const r = rowAt(p);
+                if (r === -1) continue;
+                for (let c = colMin; c <= colMax; c++) selected.add(r * numCols + c);
+            }
+            scheduleRender();
+        }
+
+        function toggleKeys(keys) {
+            const allSelected = keys.every(k => selected.has(k));
+            keys.forEach(k => {
+                if (allSelected) selected.delete(k); else selected.add(k);
+            });
+            scheduleRender();
+        }
+
+        function toggleCell(coords) {
+            toggleKeys([rowAt(coords.p) * numCols + coords.col]);
+        }
+
+        function toggleRow(p) {
+            const base = rowAt(p) * numCols;
+            toggleKeys(Array.from({ length: numCols }, (_, c) => base + c));
+        }
+
+        function toggleColumn(colIdx) {
+            // Paged views select the rows loaded so far
+            const keys = [];
+            forEachLoadedRow((p, r) => keys.push(r * numCols + colIdx));
+            toggleKeys(keys);
+        }
 
         // --- Rectangular selection mouse handlers ---
-        tbody.addEventListener('mousedown', (e) => {{
+        tbody.addEventListener('mousedown', (e) => {
             if (!e.altKey) return;
-            const cell = e.target.closest('td') || e.target.closest('th');
-            if (!cell || !tbody.contains(cell)) return;
+            const cell = e.target.closest('td[data-p], th[data-p]');
+            if (!cell) return;
             e.preventDefault();
             e.stopPropagation();
             rectMode = cell.tagName === 'TH' ? 'row' : 'cell';
@@ -702,66 +2946,165 @@ def _build_html(df, total_rows):
             rectDragStartY = e.clientY;
             rectStartCell = getCellCoords(cell);
             rectEndCell = getCellCoords(cell);
-        }});
+        });
 
         let rafPending = false;
-        document.addEventListener('mousemove', (e) => {{
+        listen(document, 'mousemove', (e) => {
             if (!rectSelecting) return;
-            if (!rectDidDrag) {{
+            if (!rectDidDrag) {
                 const dx = e.clientX - rectDragStartX;
                 const dy = e.clientY - rectDragStartY;
                 if (Math.abs(dx) < 4 && Math.abs(dy) < 4) return;
                 rectDidDrag = true;
                 document.body.classList.add('rect-selecting');
-            }}
+            }
             if (rafPending) return;
             rafPending = true;
-            requestAnimationFrame(() => {{
+            requestAnimationFrame(() => {
                 rafPending = false;
                 const el = document.elementFromPoint(e.clientX, e.clientY);
-                const cell = el && el.closest ? (el.closest('td') || el.closest('th')) : null;
-                if (cell && tbody.contains(cell)) {{
+                const cell = el && el.closest ? el.closest('td[data-p], th[data-p]') : null;
+                if (cell && tbody.contains(cell)) {
                     rectEndCell = getCellCoords(cell);
                     highlightRect(rectStartCell, rectEndCell);
-                }}
-            }});
-        }});
+                }
+            });
+        });
 
-        document.addEventListener('mouseup', (e) => {{
+        listen(document, 'mouseup', (e) => {
             if (!rectSelecting) return;
             rectSelecting = false;
             document.body.classList.remove('rect-selecting');
-            if (!rectDidDrag) {{
+            if (!rectDidDrag) {
                 // Click (no drag) — toggle cell or row
-                if (rectMode === 'row') {{
-                    toggleRow(rectStartCell.row);
-                }} else {{
+                if (rectMode === 'row') {
+                    toggleRow(rectStartCell.p);
+                } else {
                     toggleCell(rectStartCell);
-                }}
-            }}
-        }});
+                }
+            }
+        });
 
-        document.addEventListener('mousedown', (e) => {{
-            if (!e.altKey && selectedCells.length > 0) {{
-                if (!openDropdown || !openDropdown.contains(e.target)) {{
+        listen(document, 'mousedown', (e) => {
+            if (!e.altKey && selected.size > 0) {
+                if (!openDropdown || !openDropdown.contains(e.target)) {
                     clearSelection();
-                }}
-            }}
-        }});
+                }
+            }
+        });
 
         // --- Cell expand on click ---
-        document.querySelectorAll('tbody td').forEach(td => {{
-            td.addEventListener('click', e => {{
-                if (e.altKey) return;
-                e.stopPropagation();
-                const wasExpanded = td.classList.contains('expanded');
-                document.querySelectorAll('td.expanded').forEach(el => el.classList.remove('expanded'));
-                if (!wasExpanded) td.classList.add('expanded');
-            }});
-        }});
-        document.addEventListener('click', () => {{
-            document.querySelectorAll('td.expanded').forEach(el => el.classList.remove('expanded'));
-        }});
-    }})();
-    </script>
-</body></html>"""
+        tbody.addEventListener('click', e => {
+            if (e.altKey) return;
+            const td = e.target.closest('td[data-p]');
+            if (!td) return;
+            e.stopPropagation();
+            const r = rowAt(Number(td.dataset.p));
+            const c = Number(td.dataset.c);
+            expanded = expanded && expanded.row === r && expanded.col === c ? null : { row: r, col: c };
+            scheduleRender();
+        });
+        listen(document, 'click', () => {
+            if (expanded) {
+                expanded = null;
+                scheduleRender();
+            }
+        });
+
+        const renderStart = performance.now();
+        layoutColumns();
+        render();
+        recordTiming('firstRender', renderStart);
+        if (marks || options.note) showCounts();
+
+        // The server releases frames whose page stops sending heartbeats
+        let heartbeat = null;
+        if (remote) {
+            const ping = () => callServer({ op: 'ping' }).catch(() => {});
+            ping();
+            heartbeat = setInterval(ping, HEARTBEAT_MS);
+            // A standalone page also says when it closes; its frame is kept
+            // a little longer in case it is only being reloaded
+            if (apiUrl && !options.send && window.parent === window) {
+                listen(window, 'pagehide', e => {
+                    if (!e.persisted) navigator.sendBeacon(apiUrl, JSON.stringify({ op: 'close' }));
+                });
+            }
+        }
+
+        return {
+            timings: timings,
+            refresh: scheduleRender,
+            destroy() {
+                clearInterval(heartbeat);
+                closeDropdown();
+                listeners.forEach(([target, type, fn]) => target.removeEventListener(type, fn));
+            },
+        };
+    }
+"""
+
+
+_BUNDLE_STYLE = r"""    body.bundle {
+        display: flex;
+        flex-direction: column;
+    }
+    .frame-tabs {
+        display: flex;
+        flex-wrap: wrap;
+        gap: 4px;
+        padding: 12px 20px 0;
+        border-bottom: 1px solid #dee2e6;
+    }
+    .frame-tabs button {
+        font: inherit;
+        font-size: 13px;
+        padding: 6px 12px;
+        border: 1px solid #dee2e6;
+        border-bottom: none;
+        border-radius: 4px 4px 0 0;
+        background: #f7f7f9;
+        cursor: pointer;
+    }
+    .frame-tabs button.active {
+        background: #fff;
+        font-weight: 600;
+    }
+    .frame-tabs .shape {
+        color: #999;
+        font-size: 11px;
+        font-weight: normal;
+    }
+    .frames {
+        flex: 1;
+        min-height: 0;
+    }
+    .dfview[hidden] {
+        display: none;
+    }
+"""
+
+_BUNDLE_SCRIPT = r"""    (function() {
+        const tabs = Array.from(document.querySelectorAll('.frame-tabs button'));
+        const roots = Array.from(document.querySelectorAll('.frames .dfview'));
+        const mounted = [];
+
+        function select(i) {
+            tabs.forEach((tab, k) => tab.classList.toggle('active', k === i));
+            roots.forEach((root, k) => { root.hidden = k !== i; });
+            if (mounted[i]) {
+                mounted[i].refresh();
+                return;
+            }
+            // Decode this frame's payload on first use, then drop its text
+            const el = document.getElementById('dfview-frame-' + i);
+            const start = performance.now();
+            const frame = JSON.parse(el.textContent);
+            el.remove();
+            mounted[i] = dfviewMount(roots[i], frame, { parseMs: performance.now() - start });
+        }
+
+        tabs.forEach((tab, i) => tab.addEventListener('click', () => select(i)));
+        select(0);
+    })();
+"""
@@ -0,0 +1,172 @@
+"""Differences between two DataFrames, shown in the viewer.
+
+Rows are aligned by key with hash lookups and every column is compared in
+one vectorized operation. Columns keep the new values and their dtypes, so
+sorting and range filters work on them as usual; the old values of changed
+cells travel in the page's marks, which render them as ``old → new``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .backends import backend_for
+from .dfview import _format_column, _show
+
+_STATUSES = np.array(["changed", "added", "removed"], dtype=object)
+
+
+def diff(left, right, key=None, rtol=1e-09, atol=0.0, open_browser=True, server=False):
+    """Show the rows that differ between two DataFrames.
+
+    Rows are aligned by the ``key`` columns, or by the index when no key is
+    given. Only changed, added and removed rows are shown; the first index
+    level holds each row's status. Changed cells read ``old → new`` and are
+    highlighted, added rows are shown in green and removed rows in red.
+    Columns present in only one frame are shown but do not make a row
+    differ.
+
+    Parameters
+    ----------
+    left, right : pd.DataFrame, polars.DataFrame or pyarrow.Table
+        The old and the new frame.
+    key : str or list of str, optional
+        Columns identifying a row. Defaults to the index. Keys must be unique
+        within each frame.
+    rtol, atol : float, optional
+        Relative and absolute tolerance for comparing float columns, as in
+        :func:`numpy.isclose`. Missing values equal each other.
+    open_browser, server : bool, optional
+        As for :func:`dfview.show`.
+
+    Returns
+    -------
+    str or None
+        As for :func:`dfview.show`.
+    """
+    frame, marks = _diff_frame(left, right, key, rtol, atol)
+    return _show(frame, len(frame), open_browser, server, marks=marks)
+
+
+def _keyed(df, key):
+    df = backend_for(df).to_pandas(df)
+    if key is not None:
+        df = df.set_index(key)
+    if not df.index.is_unique:
+        raise ValueError("Rows must have unique keys to be compared")
+    if not df.columns.is_unique:
+        raise ValueError("Columns must be unique to be compared")
+    return df
+
+
+def _differs(a, b, rtol, atol):
+    """Elementwise inequality of two aligned columns; missing equals missing."""
+    missing_a = a.isna().to_numpy(dtype=bool)
+    missing_b = b.isna().to_numpy(dtype=bool)
+    numeric = all(
+        pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype)
+        for s in (a, b)
+    )
+    if numeric and (pd.api.types.is_float_dtype(a.dtype) or pd.api.types.is_float_dtype(b.dtype)):
+        x = a.to_numpy(dtype=np.float64, na_value=np.nan)
+        y = b.to_numpy(dtype=np.float64, na_value=np.nan)
+        same = np.isclose(x, y, rtol=rtol, atol=atol, equal_nan=True)
+    else:
+        try:
+            same = (a == b).to_numpy(dtype=bool, na_value=False)
+        except TypeError:
+            # e.g. categoricals with different categories
+            same = (a.astype(object) == b.astype(object)).to_numpy(dtype=bool, na_value=False)
+    same = np.where(missing_a | missing_b, missing_a & missing_b, same)
+    return ~same
+
+
+def _take(df, col, pos):
+    """Values of ``df[col]`` at positions ``pos``, or missing if ``col`` is absent."""
+    if col not in df.columns:
+        return pd.Series(None, index=range(len(pos)), dtype=object)
+    return df[col].iloc[pos].reset_index(drop=True)
+
+
+def _combine(right_part, left_part, from_right):
+    """Interleave values taken from the right frame and from the left frame."""
+    parts = [p for p in (right_part, left_part) if len(p)]
+    if not parts:
+        return right_part
+    combined = pd.concat(parts, ignore_index=True)
+    order = np.concatenate([np.flatnonzero(from_right), np.flatnonzero(~from_right)])
+    return combined.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+
+
+def _diff_frame(left, right, key, rtol, atol):
+    """Frame of the differing rows and the marks highlighting them.
+
+    Returns
+    -------
+    frame : pd.DataFrame
+        The changed, added and removed rows, indexed by status and key.
+    marks : dict
+        ``rows``: status code per row (0 changed, 1 added, 2 removed);
+        ``cells``: per rendered column, the positions of changed cells or
+        None; ``old``: the old values' text of those cells, in the same
+        order; ``summary``: counts for the info bar.
+    """
+    left = _keyed(left, key)
+    right = _keyed(right, key)
+
+    added = ~right.index.isin(left.index)
+    rows = left.index.append(right.index[added])
+    lpos = left.index.get_indexer(rows)
+    rpos = right.index.get_indexer(rows)
+    both = (lpos >= 0) & (rpos >= 0)
+    columns = left.columns.append(right.columns[~right.columns.isin(left.columns)])
+
+    # Compare every shared column over the rows present in both frames
+    both_rows = np.flatnonzero(both)
+    changed = {}
+    row_changed = np.zeros(len(rows), dtype=bool)
+    for col in columns:
+        if col in left.columns and col in right.columns:
+            hit = np.zeros(len(rows), dtype=bool)
+            hit[both_rows] = _differs(
+                _take(left, col, lpos[both_rows]), _take(right, col, rpos[both_rows]), rtol, atol
+            )
+            changed[col] = hit
+            row_changed |= hit
+
+    keep = np.flatnonzero(~both | row_changed)
+    src_l = lpos[keep]
+    src_r = rpos[keep]
+    from_right = src_r >= 0
+    status = np.where(src_l < 0, 1, np.where(src_r < 0, 2, 0))
+
+    data = []
+    cell_marks = []
+    old_marks = []
+    for col in columns:
+        values = _combine(
+            _take(right, col, src_r[from_right]), _take(left, col, src_l[~from_right]), from_right
+        )
+        hit = changed[col][keep] if col in changed else np.zeros(len(keep), dtype=bool)
+        data.append(values)
+        if hit.any():
+            cell_marks.append(np.flatnonzero(hit).tolist())
+            old_marks.append(_format_column(_take(left, col, src_l[hit])))
+        else:
+            cell_marks.append(None)
+            old_marks.append(None)
+
+    keys = rows[keep]
+    levels = [keys.get_level_values(i) for i in range(keys.nlevels)]
+    index = pd.MultiIndex.from_arrays([_STATUSES[status], *levels], names=["diff", *keys.names])
+    frame = pd.DataFrame(dict(enumerate(data)))
+    frame.index = index
+    frame.columns = columns
+
+    counts = np.bincount(status, minlength=3)
+    marks = {
+        "rows": status.tolist(),
+        "cells": [None] * index.nlevels + cell_marks,
+        "old": [None] * index.nlevels + old_marks,
+        "summary": f"{counts[0]} changed, {counts[1]} added, {counts[2]} removed",
+    }
+    return frame, marks
@@ -0,0 +1,314 @@
+"""Inline viewer for Jupyter notebooks.
+
+The frame stays in the kernel. The output cell holds the viewer, its script
+and the first block of rows only, so notebook files stay small whatever the
+size of the frame. The page fetches further rows, sort orders, filter
+results and value lists from a :class:`~dfview.server.FrameSession` as they
+are needed:
+
+- with anywidget installed, the viewer is a widget and its requests travel
+  as messages of the widget's model, which JupyterLab, Notebook 7, VS Code
+  and the classic notebook all support, for local and remote kernels alike;
+- otherwise through a Jupyter comm where the front end exposes the kernel
+  to output scripts (the classic notebook), and over HTTP from the local
+  server elsewhere, which only works when the notebook server runs on the
+  same machine as the kernel.
+
+Running a cell again releases the sessions of the views it showed before.
+"""
+
+import threading
+
+from .dfview import (
+    _PAGE_SCRIPT,
+    _PAGE_STYLE,
+    _frame_payload,
+    _script_json,
+    _viewer_markup,
+)
+from .server import _HANDLED_ERRORS, FrameSession, _unexpected_error, get_server
+
+_COMM_TARGET = "dfview"
+
+_registered = False
+_register_lock = threading.Lock()
+_widget_class = None
+
+# Notebook cell id -> (id of the run that showed them, [(token, widget)])
+_cell_views = {}
+_cell_views_lock = threading.Lock()
+
+
+def show_inline(df, total_rows, profile):
+    """Display the frame in the current notebook cell's output."""
+    try:
+        from IPython.display import HTML, display
+    except ImportError as exc:
+        raise ImportError("show(..., inline=True) needs IPython, e.g. a Jupyter kernel") from exc
+
+    viewer = get_server()
+    token = viewer.register(FrameSession(df))
+    widget = _inline_widget(df, total_rows, token, profile)
+    _replace_cell_views(viewer, token, widget)
+    if widget is not None:
+        with profile.phase("display"):
+            display(widget)
+        return
+
+    _register_comm_target()
+    html = _inline_html(df, total_rows, token, f"{viewer.url}/api/{token}", profile)
+    with profile.phase("display"):
+        display(HTML(html))
+
+
+def _inline_payload(df, total_rows, token, api_url, profile):
+    """The first block of rows and the page options, as JSON text."""
+    with profile.phase("format"):
+        session = get_server().session(token)
+        payload = _frame_payload(df, total_rows, server=True, paged=True, session=session)
+    with profile.phase("serialize"):
+        payload = _script_json(payload)
+    profile.output("payload", payload)
+    options = _script_json({"apiUrl": api_url, "session": token, "profile": profile.enabled})
+    return payload, options
+
+
+def _inline_html(df, total_rows, token, api_url, profile):
+    n_rows, n_cols = df.shape
+    payload, options = _inline_payload(df, total_rows, token, api_url, profile)
+
+    with profile.phase("template"):
+        html = f"""<div class="dfview-inline" id="dfview-{token}">
+<style>
+{_PAGE_STYLE}{_INLINE_STYLE}</style>
+{_viewer_markup(n_rows, n_cols, server=True)}
+<script type="application/json" id="dfview-frame-{token}">{payload}</script>
+<script>
+{_PAGE_SCRIPT}
+{_INLINE_SCRIPT}
+    (function() {{
+        const start = performance.now();
+        const frame = JSON.parse(document.getElementById('dfview-frame-{token}').textContent);
+        const options = {options};
+        options.parseMs = performance.now() - start;
+        options.send = dfviewKernelTransport(options.session);
+        dfviewMount(document.querySelector('#dfview-{token} .dfview'), frame, options);
+    }})();
+</script>
+</div>"""
+    profile.output("page", html)
+    return html
+
+
+def _inline_widget(df, total_rows, token, profile):
+    """A widget showing the frame, or None when anywidget is not installed."""
+    cls = _widget_type()
+    if cls is None:
+        return None
+    payload, options = _inline_payload(df, total_rows, token, None, profile)
+    with profile.phase("template"):
+        widget = cls(
+            token,
+            markup=_viewer_markup(*df.shape, server=True),
+            frame=payload,
+            options=options,
+        )
+    return widget
+
+
+def _widget_type():
+    """The inline viewer's widget class, defined on first use."""
+    global _widget_class
+    try:
+        import anywidget
+        import traitlets
+    except ImportError:
+        return None
+    with _register_lock:
+        if _widget_class is None:
+
+            class InlineViewer(anywidget.AnyWidget):
+                _esm = _PAGE_SCRIPT + _WIDGET_SCRIPT
+                _css = _PAGE_STYLE + _INLINE_STYLE
+                markup = traitlets.Unicode().tag(sync=True)
+                frame = traitlets.Unicode().tag(sync=True)
+                options = traitlets.Unicode().tag(sync=True)
+
+                def __init__(self, token, **kwargs):
+                    super().__init__(**kwargs)
+                    self.token = token
+                    self.on_msg(_receive_widget_message)
+
+            _widget_class = InlineViewer
+        return _widget_class
+
+
+def _receive_widget_message(widget, content, buffers):
+    session = get_server().session(widget.token)
+    widget.send(_answer(session, content.get("id"), content.get("request")))
+
+
+def _replace_cell_views(viewer, token, widget):
+    """Record a view of the running cell, releasing those of its earlier runs."""
+    cell, run = _running_cell()
+    if cell is None:
+        return
+    with _cell_views_lock:
+        last_run, views = _cell_views.get(cell, (None, []))
+        stale = []
+        if last_run != run:
+            stale, views = views, []
+        _cell_views[cell] = (run, views + [(token, widget)])
+    for old_token, old_widget in stale:
+        viewer.release(old_token)
+        if old_widget is not None:
+            old_widget.close()
+
+
+def _running_cell():
+    """Ids of the running notebook cell and of the request that runs it.
+
+    Front ends send the cell id with execute requests since Jupyter
+    protocol 5.4 (JupyterLab 3, Notebook 7, VS Code); without it both are
+    None and the views are left to the server's session limits.
+    """
+    try:
+        from IPython import get_ipython
+    except ImportError:
+        return None, None
+    kernel = getattr(get_ipython(), "kernel", None)
+    if kernel is None or not hasattr(kernel, "get_parent"):
+        return None, None
+    parent = kernel.get_parent() or {}
+    cell = (parent.get("metadata") or {}).get("cellId")
+    if cell is None:
+        return None, None
+    return cell, parent.get("header", {}).get("msg_id")
+
+
+def _register_comm_target():
+    """Answer the inline views' comm requests in this kernel, once per process."""
+    global _registered
+    with _register_lock:
+        if _registered:
+            return
+        manager = _comm_manager()
+        if manager is not None:
+            manager.register_target(_COMM_TARGET, _open_comm)
+        _registered = True
+
+
+def _comm_manager():
+    try:
+        from comm import get_comm_manager
+    except ImportError:
+        get_comm_manager = None
+    if get_comm_manager is not None:
+        return get_comm_manager()
+    from IPython import get_ipython
+
+    kernel = getattr(get_ipython(), "kernel", None)
+    return getattr(kernel, "comm_manager", None)
+
+
+def _open_comm(comm, open_msg):
+    token = open_msg["content"]["data"].get("session")
+
+    @comm.on_msg
+    def _receive(msg):
+        data = msg["content"]["data"]
+        session = get_server().session(token)
+        comm.send(_answer(session, data.get("id"), data.get("request")))
+
+
+def _answer(session, request_id, request):
+    """Reply to one comm message, as the HTTP API would."""
+    if session is None:
+        return {"id": request_id, "error": "Unknown viewer session; run the cell again"}
+    try:
+        return {"id": request_id, "result": session.handle(request)}
+    except _HANDLED_ERRORS as exc:
+        return {"id": request_id, "error": str(exc)}
+    except Exception as exc:
+        return dict(_unexpected_error(exc), id=request_id)
+
+
+_INLINE_STYLE = r"""    .dfview-inline .dfview {
+        height: 420px;
+        padding: 8px 0;
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    }
+"""
+
+# Returns a request function talking to the kernel over a comm, or null
+# where the front end gives output scripts no kernel handle.
+_INLINE_SCRIPT = r"""    function dfviewKernelTransport(session) {
+        const kernel = window.Jupyter && Jupyter.notebook && Jupyter.notebook.kernel;
+        if (!kernel || !kernel.comm_manager) return null;
+        const comm = kernel.comm_manager.new_comm('dfview', { session: session });
+        const waiting = new Map();
+        let nextId = 0;
+        comm.on_msg(msg => {
+            const reply = msg.content.data;
+            const entry = waiting.get(reply.id);
+            if (!entry) return;
+            waiting.delete(reply.id);
+            if (reply.error) entry.reject(new Error(reply.error)); else entry.resolve(reply.result);
+        });
+        comm.on_close(() => {
+            waiting.forEach(entry => entry.reject(new Error('The kernel closed the connection')));
+            waiting.clear();
+        });
+        return request => new Promise((resolve, reject) => {
+            const id = ++nextId;
+            waiting.set(id, { resolve: resolve, reject: reject });
+            comm.send({ id: id, request: request });
+        });
+    }
+"""
+
+# The widget's ES module. Replies to custom messages reach every view of the
+# model, so each view prefixes its request ids; rendering returns the
+# cleanup the front end calls when the view is removed.
+_WIDGET_SCRIPT = r"""
+    function dfviewWidgetTransport(model) {
+        const prefix = Math.random().toString(36).slice(2) + ':';
+        const waiting = new Map();
+        let nextId = 0;
+        function receive(reply) {
+            const entry = reply && waiting.get(reply.id);
+            if (!entry) return;
+            waiting.delete(reply.id);
+            if (reply.error) entry.reject(new Error(reply.error)); else entry.resolve(reply.result);
+        }
+        model.on('msg:custom', receive);
+        const send = request => new Promise((resolve, reject) => {
+            const id = prefix + (++nextId);
+            waiting.set(id, { resolve: resolve, reject: reject });
+            model.send({ id: id, request: request });
+        });
+        send.close = () => {
+            model.off('msg:custom', receive);
+            waiting.forEach(entry => entry.reject(new Error('The view was closed')));
+            waiting.clear();
+        };
+        return send;
+    }
+
+    export default {
+        render({ model, el }) {
+            el.classList.add('dfview-inline');
+            el.innerHTML = model.get('markup');
+            const start = performance.now();
+            const frame = JSON.parse(model.get('frame'));
+            const options = JSON.parse(model.get('options'));
+            options.parseMs = performance.now() - start;
+            options.send = dfviewWidgetTransport(model);
+            const view = dfviewMount(el.querySelector('.dfview'), frame, options);
+            return () => {
+                view.destroy();
+                options.send.close();
+            };
+        },
+    };
+"""
@@ -0,0 +1,545 @@
+"""Local HTTP server for dfview's server mode.
+
+The page is served from ``/view/<token>`` and posts JSON requests to
+``/api/<token>``, which are answered by the :class:`FrameSession` holding the
+DataFrame; inline notebook views (:mod:`dfview.notebook`) call the same API.
+The reusable viewer tab is served from ``/session/<token>/`` and
+shows the frames of a :class:`~dfview.session.TabSession`. The server binds to
+localhost only and runs in a daemon thread.
+"""
+
+import atexit
+import json
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from .dfview import (
+    _decode_mask,
+    _encode_mask,
+    _filter_mask,
+    _float_layout,
+    _format_column,
+    _format_float_layout,
+    _group_codes,
+    _group_summary,
+    _json_rows,
+    _log,
+    _marks_index,
+    _query_mask,
+    _rank,
+    _rendered_column,
+    _rendered_columns,
+    _rows_block,
+    _sort_order,
+)
+from .session import SHELL_PAGE, TabSession, get_store
+
+_QUERY_CACHE_SIZE = 64
+_GROUPING_CACHE_SIZE = 16
+_VIEW_CACHE_SIZE = 4
+_MAX_VALUES = 100000
+_DEFAULT_MAX_SESSIONS = 32
+_DEFAULT_IDLE_SECONDS = 300
+# Time a closed page has to come back, e.g. when it was reloaded
+_CLOSE_GRACE_SECONDS = 30
+
+# Errors in a request that are reported back to the page rather than raised
+_HANDLED_ERRORS = (ValueError, KeyError, TypeError, re.error)
+
+# Origins of pages served from this machine, such as a local notebook server
+_LOCAL_ORIGIN = re.compile(r"https?://(localhost|127\.0\.0\.1|\[::1\])(:\d+)?")
+
+
+class FrameSession:
+    """A DataFrame kept in this process for one viewer page.
+
+    ``marks`` are the diff marks of the frame's rows, see :mod:`dfview.diff`;
+    blocks of rows are sent with the marks of their rows.
+    """
+
+    def __init__(self, df, marks=None):
+        self.df = df
+        self.marks = _marks_index(marks)
+        self.page = None
+        self.timings = None
+        self._queries = OrderedDict()
+        self._groupings = OrderedDict()
+        self._ranks = OrderedDict()
+        self._texts = OrderedDict()
+        self._views = OrderedDict()
+        self._layouts = None
+        self._lock = threading.Lock()
+
+    def handle(self, request):
+        """Answer one JSON request from the page.
+
+        Parameters
+        ----------
+        request : dict
+            The decoded request; ``op`` selects the operation.
+
+        Returns
+        -------
+        dict
+            The JSON-serializable response.
+        """
+        op = request.get("op")
+        if op == "filter":
+            mask = _filter_mask(self.df, request.get("conditions", []))
+        elif op == "query":
+            mask = self.query(request["expr"])
+        elif op == "groupby":
+            return self.groupby(request)
+        elif op == "view":
+            return self.view_info(request)
+        elif op == "rows":
+            return self.rows(request["view"], int(request["start"]), int(request["stop"]))
+        elif op == "values":
+            return self.values(int(request["col"]))
+        elif op == "timings":
+            return self.record_timings(request["timings"])
+        elif op == "ping":
+            return {}
+        else:
+            raise ValueError(f"Unknown request: {op!r}")
+        return {"mask": _encode_mask(mask), "count": int(mask.sum())}
+
+    def record_timings(self, timings):
+        """Store page timings posted back by a profiled page."""
+        if self.timings is None:
+            raise ValueError("Profiling is off for this page")
+        with self._lock:
+            self.timings.update({str(k): float(v) for k, v in timings.items()})
+        _log.info("page timings (ms): %s", ", ".join(f"{k} {v:.1f}" for k, v in self.timings.items()))
+        return {}
+
+    def query(self, expr):
+        """Row mask for a ``DataFrame.query`` expression, cached by expression."""
+        expr = expr.strip()
+        return self._cached(self._queries, _QUERY_CACHE_SIZE, expr, lambda: _query_mask(self.df, expr))
+
+    def _cached(self, cache, size, key, compute):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = compute()
+        with self._lock:
+            cache[key] = value
+            if len(cache) > size:
+                cache.popitem(last=False)
+        return value
+
+    def grouping(self, keys):
+        """Group codes for the given key columns, cached by key tuple."""
+        keys = tuple(keys)
+        return self._cached(
+            self._groupings, _GROUPING_CACHE_SIZE, keys,
+            lambda: _group_codes([_rendered_column(self.df, k) for k in keys]),
+        )
+
+    def ranks(self, col):
+        """Dense ranks of one rendered column, cached by column."""
+        return self._cached(
+            self._ranks, _GROUPING_CACHE_SIZE, col, lambda: _rank(_rendered_column(self.df, col))
+        )
+
+    def float_layouts(self):
+        """:func:`_float_layout` of every rendered column, computed once.
+
+        Blocks of rows and value lists are formatted with them, so a float
+        shows with the same number of decimals wherever it is listed.
+        """
+        if self._layouts is None:
+            layouts = [_float_layout(c) for c in _rendered_columns(self.df)]
+            with self._lock:
+                self._layouts = layouts
+        return self._layouts
+
+    def value_texts(self, col):
+        """Display text of a column's distinct values, in sorted order.
+
+        Only the first ``_MAX_VALUES`` values are listed. Their positions are
+        the group codes of :meth:`grouping`, so value filters select groups.
+        """
+        def compute():
+            first = self.grouping([col])[1][:_MAX_VALUES]
+            values = _rendered_column(self.df, col).take(first)
+            layout = self.float_layouts()[col]
+            texts = None if layout is None else _format_float_layout(values, layout)
+            return _format_column(values) if texts is None else texts
+
+        return self._cached(self._texts, _GROUPING_CACHE_SIZE, col, compute)
+
+    def values(self, col):
+        """Distinct values of a column for the page's value filter list."""
+        texts = self.value_texts(col)
+        return {"values": texts, "total": len(self.grouping([col])[1])}
+
+    def view(self, spec):
+        """Row positions shown for a page's sort and filter state.
+
+        Parameters
+        ----------
+        spec : dict
+            ``sort``: ``[column, ascending]`` pairs, primary first;
+            ``conditions``: as for :func:`~dfview.dfview._filter_mask`;
+            ``values``: ``{"col", "exclude"}`` value filters hiding the rows
+            whose text is listed in ``exclude``; ``query``: a
+            ``DataFrame.query`` expression.
+
+        Returns
+        -------
+        np.ndarray or None
+            Positions of the shown rows in display order, or None when all
+            rows are shown in their original order.
+        """
+        key = json.dumps(spec, sort_keys=True)
+        return self._cached(self._views, _VIEW_CACHE_SIZE, key, lambda: self._compute_view(spec))
+
+    def _compute_view(self, spec):
+        mask = None
+        conditions = spec.get("conditions") or []
+        if conditions:
+            mask = _filter_mask(self.df, conditions)
+        query = (spec.get("query") or "").strip()
+        if query:
+            mask = self.query(query) if mask is None else mask & self.query(query)
+        for value_filter in spec.get("values") or []:
+            col = int(value_filter["col"])
+            hidden = np.flatnonzero(pd.Index(self.value_texts(col)).isin(value_filter["exclude"]))
+            keep = ~np.isin(self.grouping([col])[0], hidden)
+            mask = keep if mask is None else mask & keep
+        keys = [(int(col), bool(ascending)) for col, ascending in spec.get("sort") or []]
+        if keys:
+            ranks = {col: self.ranks(col) for col, _ in keys}
+            order = _sort_order(ranks, keys)
+            positions = order if mask is None else order[mask[order]]
+        elif mask is not None:
+            positions = np.flatnonzero(mask)
+        else:
+            return None
+        dtype = np.int32 if len(self.df) < 2**31 else np.int64
+        return positions.astype(dtype, copy=False)
+
+    def view_info(self, request):
+        """Length of a view and the block of rows starting at ``start``."""
+        positions = self.view(request["view"])
+        length = len(self.df) if positions is None else len(positions)
+        start = min(int(request.get("start", 0)), length)
+        block = self.rows(request["view"], start, start + int(request.get("rows", 0)))
+        return {"length": length, "page": block}
+
+    def rows(self, spec, start, stop):
+        """Cell text of the rows at view positions ``start`` to ``stop``."""
+        positions = self.view(spec)
+        if positions is None:
+            ids = np.arange(max(0, start), max(0, min(stop, len(self.df))))
+        else:
+            ids = positions[max(0, start):max(0, stop)]
+        return _rows_block(self.df, ids, self.marks, self.float_layouts())
+
+    def groupby(self, request):
+        """Aggregate the frame for a ``groupby`` request.
+
+        The request names the ``keys`` and ``values`` columns by rendered
+        column index, the ``agg`` function, and optionally a base64 ``mask``
+        of the rows currently shown in the page, or the ``view`` spec of a
+        paged page (see :meth:`view`).
+        """
+        keys = [int(k) for k in request["keys"]]
+        if not keys:
+            raise ValueError("Select at least one column to group by")
+        values = [int(v) for v in request.get("values", [])]
+        mask = request.get("mask")
+        if mask is not None:
+            mask = _decode_mask(mask, len(self.df))
+        elif request.get("view") is not None:
+            positions = self.view(request["view"])
+            if positions is not None:
+                mask = np.zeros(len(self.df), dtype=bool)
+                mask[positions] = True
+        result = _group_summary(
+            self.df, keys, values, request.get("agg", "size"), self.grouping(keys), mask
+        )
+        return {"columns": list(result.columns), "rows": _json_rows(result)}
+
+
+def _unexpected_error(exc):
+    """Error reply for a request that failed other than by a handled error."""
+    _log.debug("viewer request failed", exc_info=True)
+    return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _session(self, prefix):
+        if not self.path.startswith(prefix):
+            return None
+        return self.server.viewer.session(self.path[len(prefix):])
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self._allow_origin()
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _foreign_origin(self):
+        """Whether the request comes from a page not served by this machine."""
+        origin = self.headers.get("Origin")
+        return origin is not None and not _LOCAL_ORIGIN.fullmatch(origin)
+
+    def _allow_origin(self):
+        # Inline notebook views without a kernel transport call the API from
+        # a notebook server on this machine; other sites get no access.
+        if self.path.startswith("/api/") and "Origin" in self.headers and not self._foreign_origin():
+            self.send_header("Access-Control-Allow-Origin", self.headers["Origin"])
+            self.send_header("Vary", "Origin")
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._allow_origin()
+        self.send_header("Access-Control-Allow-Methods", "POST")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.end_headers()
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload), "application/json")
+
+    def do_GET(self):
+        if self.path.startswith("/session/"):
+            self._get_tab(self.path[len("/session/"):])
+            return
+        session = self._session("/view/")
+        if session is None or session.page is None:
+            self._send(404, "Not found", "text/plain")
+            return
+        self._send(200, session.page, "text/html; charset=utf-8")
+
+    def _get_tab(self, path):
+        token, _, rest = path.partition("/")
+        viewer = self.server.viewer
+        if viewer._tab is None or token != viewer._tab_token:
+            self._send(404, "Not found", "text/plain")
+        elif rest == "":
+            self._send(200, SHELL_PAGE, "text/html; charset=utf-8")
+        elif rest == "state":
+            self._send_json(200, viewer._tab.poll())
+        elif rest.startswith("frames/") and rest[len("frames/"):].isdigit():
+            path = viewer._tab.frame_path(int(rest[len("frames/"):]))
+            page = None
+            if path is not None:
+                # The store may evict the page between the lookup and the read
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        page = f.read()
+                except OSError:
+                    pass
+            if page is None:
+                self._send(404, "This frame was evicted from the render store", "text/plain")
+                return
+            self._send(200, page, "text/html; charset=utf-8")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+    def do_POST(self):
+        if self._foreign_origin():
+            self._send_json(403, {"error": "Requests from other sites are not allowed"})
+            return
+        session = self._session("/api/")
+        if session is None:
+            self._send_json(404, {"error": "Unknown viewer session"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            if request.get("op") == "close":
+                # Sent by the page as it unloads
+                self.server.viewer.leave(self.path[len("/api/"):])
+                response = {}
+            else:
+                response = session.handle(request)
+        except _HANDLED_ERRORS as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+        except Exception as exc:
+            self._send_json(500, _unexpected_error(exc))
+            return
+        self._send_json(200, response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ViewerServer:
+    """Threaded HTTP server holding the frame sessions of this process.
+
+    At most ``max_sessions`` sessions are kept besides those registered
+    with ``keep=True``; registering another releases the least recently
+    used. Open pages send a heartbeat, and a
+    session whose page has not been heard from for ``idle_seconds`` is
+    released too, shortly after the page says it is closing.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        max_sessions=_DEFAULT_MAX_SESSIONS,
+        idle_seconds=_DEFAULT_IDLE_SECONDS,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.viewer = self
+        self._sessions = OrderedDict()
+        # Token -> monotonic time after which the session is released; set
+        # once its page is heard from
+        self._deadlines = {}
+        # Tokens of the reusable tab's frames, released with their entries
+        self._kept = set()
+        self._sessions_lock = threading.Lock()
+        self._tab = None
+        self._tab_token = secrets.token_urlsafe(16)
+        self._tab_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sessions(self):
+        return self._sessions
+
+    @property
+    def tab(self):
+        """The :class:`~dfview.session.TabSession` of the reusable viewer tab."""
+        with self._tab_lock:
+            if self._tab is None:
+                self._tab = TabSession(get_store(), release=self._release)
+            return self._tab
+
+    @property
+    def tab_url(self):
+        return f"{self.url}/session/{self._tab_token}/"
+
+    def register(self, session, keep=False):
+        """Add a session and return the token its URLs are keyed by.
+
+        Sessions with ``keep=True`` are neither evicted nor timed out; they
+        stay until :meth:`release` is called.
+        """
+        token = secrets.token_urlsafe(16)
+        with self._sessions_lock:
+            self._sessions[token] = session
+            if keep:
+                self._kept.add(token)
+            self._expire(time.monotonic())
+            evictable = [t for t in self._sessions if t not in self._kept]
+            for old in evictable[: max(0, len(evictable) - self.max_sessions)]:
+                if old != token:
+                    self._drop(old)
+        return token
+
+    def session(self, token):
+        """The session for a token, or None once released.
+
+        Counts as a sign of life from the session's page.
+        """
+        now = time.monotonic()
+        with self._sessions_lock:
+            self._expire(now)
+            session = self._sessions.get(token)
+            if session is not None:
+                self._sessions.move_to_end(token)
+                self._deadlines[token] = now + self.idle_seconds
+            return session
+
+    def leave(self, token):
+        """Release a session soon unless its page comes back, e.g. on reload."""
+        with self._sessions_lock:
+            if token in self._sessions:
+                self._deadlines[token] = time.monotonic() + _CLOSE_GRACE_SECONDS
+
+    def release(self, token):
+        """Drop a session; its page or inline view stops answering."""
+        with self._sessions_lock:
+            self._drop(token)
+
+    def _drop(self, token):
+        self._sessions.pop(token, None)
+        self._deadlines.pop(token, None)
+        self._kept.discard(token)
+
+    def _expire(self, now):
+        for token in [t for t, deadline in self._deadlines.items() if deadline < now]:
+            if token not in self._kept:
+                self._drop(token)
+
+    def _release(self, entry):
+        if entry["token"] is not None:
+            self.release(entry["token"])
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_server():
+    """Return the process-wide viewer server, starting it on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ViewerServer()
+            atexit.register(_server.shutdown)
+        return _server
+
+
+def configure_sessions(max_sessions=_DEFAULT_MAX_SESSIONS, idle_seconds=_DEFAULT_IDLE_SECONDS):
+    """Set how many frames the local server keeps for its viewers.
+
+    Server-mode, paged and inline views each hold a frame in this process
+    until it is released.
+
+    Parameters
+    ----------
+    max_sessions : int, optional
+        Number of frames kept; showing another releases the least recently
+        used, whose page then stops answering. Frames in the reusable tab's
+        history are kept as long as they are listed.
+    idle_seconds : float, optional
+        Time after which a frame is released once its page stops sending its
+        heartbeat (every minute while open).
+    """
+    viewer = get_server()
+    with viewer._sessions_lock:
+        viewer.max_sessions = int(max_sessions)
+        viewer.idle_seconds = float(idle_seconds)
+
+
+def release(view):
+    """Release the frame behind a viewer, freeing what the server holds for it.
+
+    Parameters
+    ----------
+    view : str
+        The URL returned by :func:`dfview.show` in server or paged mode.
+    """
+    get_server().release(view.rstrip("/").rsplit("/", 1)[-1])
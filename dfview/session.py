@@ -0,0 +1,364 @@
+"""Bounded storage for rendered pages and the reusable viewer tab.
+
+:class:`RenderStore` keeps rendered HTML files in one directory and evicts
+the least recently used ones once a size or count budget is exceeded.
+:class:`TabSession` is the history behind the single reusable viewer tab
+served from ``/session/<token>/`` by the local server.
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+_DEFAULT_MAX_BYTES = 256 * 2**20
+_DEFAULT_MAX_FILES = 100
+_SHM_DIR = "/dev/shm"
+
+
+class RenderStore:
+    """Rendered pages on disk, bounded by total size and file count.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Parent directory for the store's own temporary directory. Defaults
+        to the system temporary directory.
+    max_bytes : int, optional
+        Total size above which the least recently used pages are deleted.
+    max_files : int, optional
+        Number of pages above which the least recently used are deleted.
+    """
+
+    def __init__(self, directory=None, max_bytes=_DEFAULT_MAX_BYTES, max_files=_DEFAULT_MAX_FILES):
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.on_evict = []
+        self._parent = directory
+        self._directory = None
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="dfview-", dir=self._parent)
+        return self._directory
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def add(self, html):
+        """Write a page and return its path, evicting old pages if over budget."""
+        data = html.encode("utf-8")
+        with self._lock:
+            path = os.path.join(self.directory, f"view-{next(self._counter)}.html")
+            with open(path, "wb") as f:
+                f.write(data)
+            self._files[path] = len(data)
+            self._bytes += len(data)
+            evicted = self._evict(keep=path)
+        for old in evicted:
+            for callback in self.on_evict:
+                callback(old)
+        return path
+
+    def touch(self, path):
+        """Mark a page as recently used; return False if it was evicted."""
+        with self._lock:
+            if path not in self._files:
+                return False
+            self._files.move_to_end(path)
+            return True
+
+    def discard(self, path):
+        with self._lock:
+            size = self._files.pop(path, None)
+            if size is None:
+                return
+            self._bytes -= size
+        _unlink(path)
+
+    def clear(self, directory=None, max_bytes=None, max_files=None):
+        """Delete all pages, optionally moving the store and changing its budget."""
+        with self._lock:
+            paths = list(self._files)
+            self._files.clear()
+            self._bytes = 0
+            old, self._directory = self._directory, None
+            if directory is not None:
+                self._parent = directory
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_files is not None:
+                self.max_files = max_files
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        for path in paths:
+            for callback in self.on_evict:
+                callback(path)
+
+    def _evict(self, keep):
+        evicted = []
+        while self._bytes > self.max_bytes or len(self._files) > self.max_files:
+            path, size = next(iter(self._files.items()))
+            if path == keep:
+                break
+            del self._files[path]
+            self._bytes -= size
+            _unlink(path)
+            evicted.append(path)
+        return evicted
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide render store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RenderStore()
+        return _store
+
+
+def configure_storage(directory=None, max_bytes=_DEFAULT_MAX_BYTES, max_files=_DEFAULT_MAX_FILES, shm=False):
+    """Configure where rendered pages are written and how many are kept.
+
+    Pages written so far are deleted.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory to write pages under. Defaults to the system temporary
+        directory.
+    max_bytes : int, optional
+        Total size of kept pages; the least recently used are deleted first.
+    max_files : int, optional
+        Number of kept pages.
+    shm : bool, optional
+        If True and ``directory`` is not given, write pages to the ``/dev/shm``
+        tmpfs so they never touch the disk. Falls back to the temporary
+        directory where ``/dev/shm`` does not exist.
+    """
+    if shm and directory is None:
+        if os.path.isdir(_SHM_DIR):
+            directory = _SHM_DIR
+        else:
+            warnings.warn(f"{_SHM_DIR} not available, using the temporary directory")
+    get_store().clear(directory or tempfile.gettempdir(), max_bytes, max_files)
+
+
+def clear_store():
+    """Delete all rendered pages, if any were written."""
+    with _store_lock:
+        store = _store
+    if store is not None:
+        store.clear()
+
+
+class TabSession:
+    """History of frames shown in the reusable viewer tab.
+
+    The tab polls :meth:`poll` and switches to the newest frame whenever one
+    is added. Entries dropped from the history are handed to ``release`` so
+    their resources can be freed.
+
+    Parameters
+    ----------
+    store : RenderStore
+        Where static pages of the history are kept. Pages it evicts drop out
+        of the history.
+    max_history : int, optional
+        Number of frames listed in the tab.
+    release : callable, optional
+        Called with each entry dropped from the history.
+    """
+
+    def __init__(self, store, max_history=20, release=None):
+        self.store = store
+        self.max_history = max_history
+        self._release = release
+        self._entries = OrderedDict()
+        self._ids = itertools.count(1)
+        self._version = 0
+        self._last_poll = None
+        self._lock = threading.Lock()
+        store.on_evict.append(self._evicted)
+
+    def add(self, name, shape, html=None, url=None, token=None):
+        """Add a frame, as a static page (``html``) or a server-mode ``url``."""
+        frame_id = next(self._ids)
+        path = self.store.add(html) if html is not None else None
+        entry = {
+            "id": frame_id,
+            "name": name or f"Frame {frame_id}",
+            "rows": shape[0],
+            "cols": shape[1],
+            "time": time.strftime("%H:%M:%S"),
+            "url": url or f"frames/{frame_id}",
+            "path": path,
+            "token": token,
+        }
+        with self._lock:
+            self._entries[frame_id] = entry
+            self._version += 1
+            dropped = []
+            while len(self._entries) > self.max_history:
+                dropped.append(self._entries.popitem(last=False)[1])
+        for old in dropped:
+            self._drop(old)
+        return entry
+
+    def poll(self):
+        """Record that the tab is alive and return the history state."""
+        self._last_poll = time.monotonic()
+        with self._lock:
+            frames = [
+                {k: v for k, v in e.items() if k not in ("path", "token")}
+                for e in reversed(self._entries.values())
+            ]
+            return {"version": self._version, "frames": frames}
+
+    def connected(self, timeout=3.0):
+        """Whether a viewer tab has polled within ``timeout`` seconds."""
+        return self._last_poll is not None and time.monotonic() - self._last_poll < timeout
+
+    def frame_path(self, frame_id):
+        """Path of a static frame's page, or None if it is gone."""
+        with self._lock:
+            entry = self._entries.get(frame_id)
+        if entry is None or entry["path"] is None or not self.store.touch(entry["path"]):
+            return None
+        return entry["path"]
+
+    def _evicted(self, path):
+        with self._lock:
+            gone = [k for k, e in self._entries.items() if e["path"] == path]
+            for k in gone:
+                del self._entries[k]
+            if gone:
+                self._version += 1
+
+    def _drop(self, entry):
+        if entry["path"] is not None:
+            self.store.discard(entry["path"])
+        if self._release is not None:
+            self._release(entry)
+
+
+SHELL_PAGE = r"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>dfview</title><style>
+    html, body {
+        height: 100%;
+        margin: 0;
+    }
+    body {
+        display: flex;
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+        background: #f8f9fa;
+    }
+    .history {
+        width: 220px;
+        flex: 0 0 auto;
+        overflow-y: auto;
+        border-right: 1px solid #dee2e6;
+        background: #f7f7f9;
+        font-size: 13px;
+    }
+    .history h1 {
+        font-size: 13px;
+        font-weight: 600;
+        color: #666;
+        margin: 0;
+        padding: 12px 14px 8px;
+    }
+    .history .frame {
+        padding: 8px 14px;
+        cursor: pointer;
+        border-bottom: 1px solid #eee;
+    }
+    .history .frame:hover { background: #e8f4fe; }
+    .history .frame.active { background: #cce5ff; }
+    .history .meta { color: #999; font-size: 11px; }
+    .history .empty { color: #999; padding: 8px 14px; }
+    iframe {
+        flex: 1;
+        border: 0;
+        height: 100%;
+    }
+</style></head><body>
+    <div class="history"><h1>Recent frames</h1><div class="list"><div class="empty">Waiting for show()...</div></div></div>
+    <iframe></iframe>
+    <script>
+    (function() {
+        const list = document.querySelector('.history .list');
+        const frameEl = document.querySelector('iframe');
+        let version = -1;
+        let newestId = null;
+        let shownId = null;
+
+        function showFrame(entry) {
+            shownId = entry.id;
+            frameEl.src = entry.url;
+            document.title = entry.name + ' - dfview';
+            list.querySelectorAll('.frame').forEach(el => {
+                el.classList.toggle('active', Number(el.dataset.id) === shownId);
+            });
+        }
+
+        function renderHistory(frames) {
+            list.textContent = '';
+            frames.forEach(entry => {
+                const item = document.createElement('div');
+                item.className = 'frame';
+                item.dataset.id = entry.id;
+                const name = document.createElement('div');
+                name.textContent = entry.name;
+                const meta = document.createElement('div');
+                meta.className = 'meta';
+                meta.textContent = entry.rows + ' × ' + entry.cols + ' · ' + entry.time;
+                item.appendChild(name);
+                item.appendChild(meta);
+                item.addEventListener('click', () => showFrame(entry));
+                list.appendChild(item);
+            });
+        }
+
+        function poll() {
+            fetch('state').then(r => r.json()).then(state => {
+                if (state.version !== version) {
+                    version = state.version;
+                    renderHistory(state.frames);
+                    const newest = state.frames[0];
+                    // Switch to a newly shown frame; otherwise keep the user's pick
+                    if (newest && newest.id !== newestId) {
+                        newestId = newest.id;
+                        showFrame(newest);
+                    } else if (shownId !== null) {
+                        const current = state.frames.find(e => e.id === shownId);
+                        if (current) showFrame(current);
+                    }
+                }
+            }).catch(() => {}).then(() => setTimeout(poll, 1000));
+        }
+        poll();
+    })();
+    </script>
+</body></html>"""
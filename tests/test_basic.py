@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+import pytest
 import tempfile
 
 import dfview
@@ -66,6 +67,528 @@ def test_show_has_sort_arrows():
     assert "sort-arrow" in html
 
 
+def test_show_embeds_column_ranks():
+    df = pd.DataFrame({"a": [3, 1, 2], "b": ["x", "Y", None]})
+    html = dfview.show(df, open_browser=False)
+    # index ranks first, then one array per column; text is case-insensitive
+    # and missing values sort last
+    assert "[[1, 2, 3], [3, 1, 2], [1, 2, 3]]" in html
+
+
+def test_sort_order_multi_column():
+    from dfview.dfview import _column_ranks, _sort_order
+
+    df = pd.DataFrame({"city": ["b", "a", "b", "a"], "salary": [1, 2, 3, 4]})
+    ranks = _column_ranks(df)
+    order = _sort_order(ranks, [(1, True), (2, False)])
+    assert order.tolist() == [3, 1, 2, 0]
+
+
+def test_filter_mask_range_and_text():
+    from dfview.dfview import _filter_mask
+
+    df = pd.DataFrame(
+        {
+            "n": [1.0, 5.0, None, 9.0],
+            "s": ["Apple", "banana", None, "cherry"],
+            "t": pd.to_datetime(["2020-01-01", "2021-06-01", None, "2022-01-01"]),
+        }
+    )
+    # rendered columns: 0 = index, 1 = n, 2 = s, 3 = t
+    assert _filter_mask(df, [{"col": 1, "kind": "range", "min": 2, "max": None}]).tolist() == [
+        False, True, False, True,
+    ]
+    assert _filter_mask(df, [{"col": 2, "kind": "contains", "pattern": "AN"}]).tolist() == [
+        False, True, False, False,
+    ]
+    assert _filter_mask(df, [{"col": 2, "kind": "regex", "pattern": "^(a|c)"}]).tolist() == [
+        True, False, False, True,
+    ]
+    start = pd.Timestamp("2021-01-01").value // 10**6
+    assert _filter_mask(df, [{"col": 3, "kind": "range", "min": start, "max": None}]).tolist() == [
+        False, True, False, True,
+    ]
+
+
+def test_payload_marks_missing_cells_for_text_filters():
+    from dfview.dfview import _frame_payload
+
+    df = pd.DataFrame({"s": ["nan", None, "b"], "n": [1, 2, 3]})
+    payload = _frame_payload(df, len(df))
+    # the missing cell's text may read like "nan" but it has its own, last rank
+    assert payload["ranks"][1] == [2, 3, 1]
+    assert payload["missingRanks"] == [None, 3, None]
+
+
+def test_show_server_mode_filters_in_python():
+    import json
+    import urllib.request
+
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "yy", "xyz"]})
+    url = dfview.show(df, open_browser=False, server=True)
+    with urllib.request.urlopen(url) as resp:
+        page = resp.read().decode("utf-8")
+    assert "filter-dropdown" in page
+
+    api = url.replace("/view/", "/api/")
+    body = json.dumps({"op": "filter", "conditions": [{"col": 2, "kind": "contains", "pattern": "x"}]})
+    req = urllib.request.Request(api, data=body.encode("utf-8"), method="POST")
+    with urllib.request.urlopen(req) as resp:
+        result = json.loads(resp.read())
+    # one bit per row: rows 0 and 2 match
+    assert result == {"mask": "oA==", "count": 2}
+
+
+def test_server_query_is_cached():
+    from dfview.server import FrameSession
+
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    session = FrameSession(df)
+    result = session.handle({"op": "query", "expr": "a >= 2 and b != 'z'"})
+    assert result["count"] == 1
+    assert session.query("a >= 2 and b != 'z'") is session.query(" a >= 2 and b != 'z' ")
+
+
+def test_query_mask_rejects_non_boolean():
+    from dfview.dfview import _query_mask
+
+    df = pd.DataFrame({"a": [1, 2]})
+    with pytest.raises(ValueError):
+        _query_mask(df, "a + 1")
+    with pytest.raises(ValueError):
+        _query_mask(df, "missing > 1")
+    with pytest.raises(ValueError):
+        _query_mask(df, "a.str.len() > 0")
+
+
+def test_query_mask_rejects_method_calls(tmp_path):
+    from dfview.dfview import _query_mask
+
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    target = tmp_path / "out.csv"
+    with pytest.raises(ValueError):
+        _query_mask(df, f"a.to_csv({str(target)!r}) == ''")
+    assert not target.exists()
+    with pytest.raises(ValueError):
+        _query_mask(df, "a.values > 1")
+    assert _query_mask(df, "b.str.contains('y') | a.isna()").tolist() == [False, True]
+
+
+def test_server_reports_failed_requests():
+    import json
+    import urllib.error
+    import urllib.request
+
+    from dfview.notebook import _answer
+    from dfview.server import FrameSession
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    url = dfview.show(df, open_browser=False, server=True)
+    body = json.dumps({"op": "filter", "conditions": [{"col": 5, "kind": "contains", "pattern": "x"}]})
+    req = urllib.request.Request(url.replace("/view/", "/api/"), data=body.encode("utf-8"), method="POST")
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(req)
+    assert info.value.code == 400
+    assert "error" in json.loads(info.value.read())
+
+    reply = _answer(FrameSession(df), 7, {"op": "view", "view": []})
+    assert reply["id"] == 7 and "error" in reply
+
+
+def test_server_api_only_allows_local_origins():
+    import json
+    import urllib.error
+    import urllib.request
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    api = dfview.show(df, open_browser=False, server=True).replace("/view/", "/api/")
+    body = json.dumps({"op": "values", "col": 0}).encode("utf-8")
+
+    def post(origin):
+        req = urllib.request.Request(api, data=body, method="POST", headers={"Origin": origin})
+        return urllib.request.urlopen(req)
+
+    with post("http://localhost:8888") as resp:
+        assert resp.headers["Access-Control-Allow-Origin"] == "http://localhost:8888"
+    with pytest.raises(urllib.error.HTTPError) as info:
+        post("https://example.com")
+    assert info.value.code == 403
+    assert "Access-Control-Allow-Origin" not in info.value.headers
+
+
+def test_viewer_server_bounds_and_releases_sessions():
+    from dfview.server import FrameSession, ViewerServer, get_server
+
+    df = pd.DataFrame({"a": [1, 2]})
+    viewer = ViewerServer(max_sessions=2)
+    try:
+        kept = viewer.register(FrameSession(df), keep=True)
+        first = viewer.register(FrameSession(df))
+        second = viewer.register(FrameSession(df))
+        assert viewer.session(first) is not None
+        third = viewer.register(FrameSession(df))
+        # The least recently used is evicted; kept sessions do not count
+        assert set(viewer.sessions) == {kept, first, third}
+
+        # Sessions are timed out once their page has been heard from
+        viewer.idle_seconds = -1
+        assert viewer.session(first) is not None
+        viewer.register(FrameSession(df), keep=True)
+        assert first not in viewer.sessions and third in viewer.sessions
+        assert viewer.session(kept) is not None and kept in viewer.sessions
+
+        viewer.release(kept)
+        assert viewer.session(kept) is None and second not in viewer.sessions
+    finally:
+        viewer.shutdown()
+
+    url = dfview.show(df, open_browser=False, server=True)
+    token = url.rsplit("/", 1)[-1]
+    assert token in get_server().sessions
+    dfview.release(url)
+    assert token not in get_server().sessions
+
+
+def test_inline_widget_answers_requests_and_releases_rerun_views(monkeypatch):
+    pytest.importorskip("anywidget")
+    from dfview import notebook
+    from dfview.server import get_server
+
+    runs = iter([("cell-1", "run-1"), ("cell-1", "run-2")])
+    monkeypatch.setattr(notebook, "_running_cell", lambda: next(runs))
+    monkeypatch.setattr(notebook, "_cell_views", {})
+    df = pd.DataFrame({"a": [3, 1, 2]})
+    dfview.show(df, inline=True)
+    [(first, first_widget)] = notebook._cell_views["cell-1"][1]
+    assert first in get_server().sessions
+
+    replies = []
+    monkeypatch.setattr(first_widget, "send", replies.append)
+    notebook._receive_widget_message(first_widget, {"id": "v:1", "request": {"op": "values", "col": 0}}, [])
+    assert replies[0]["id"] == "v:1" and "result" in replies[0]
+
+    dfview.show(df, inline=True)
+    [(second, _)] = notebook._cell_views["cell-1"][1]
+    assert first not in get_server().sessions and second in get_server().sessions
+    assert first_widget.comm is None
+
+
+def test_server_groupby_reuses_group_codes():
+    from dfview.dfview import _encode_mask
+    from dfview.server import FrameSession
+
+    df = pd.DataFrame({"City": ["b", "a", "b", None], "Salary": [1, 2, 3, 4]})
+    session = FrameSession(df)
+    result = session.handle({"op": "groupby", "keys": [1], "values": [2], "agg": "sum"})
+    assert result["columns"] == ["City", "Salary (sum)"]
+    assert result["rows"] == [["a", 2], ["b", 4], [None, 4]]
+
+    mask = _encode_mask(pd.Series([True, False, True, True]).to_numpy())
+    result = session.handle({"op": "groupby", "keys": [1], "agg": "size", "mask": mask})
+    assert result["rows"] == [["b", 2], [None, 1]]
+    assert session.grouping([1]) is session.grouping((1,))
+
+
+def test_group_summary_counts_and_means_over_group_codes():
+    import json
+
+    from dfview.dfview import _group_codes, _group_summary, _json_rows
+
+    df = pd.DataFrame({"k": ["b", "a", "b", "a"], "x": [1.0, None, 2.0, None], "s": ["p", "q", None, "r"]})
+    grouping = _group_codes([df["k"]])
+    result = _group_summary(df, [1], [2, 3], "count", grouping)
+    assert result.values.tolist() == [["a", 0, 2], ["b", 2, 1]]
+    result = _group_summary(df, [1], [2], "mean", grouping)
+    assert result["x (mean)"].isna().tolist() == [True, False]
+    assert result["x (mean)"].iloc[1] == 1.5
+    # median has no bincount form and goes through groupby
+    assert _group_summary(df, [1], [2], "median", grouping)["x (median)"].iloc[1] == 1.5
+
+    # Integer sums stay exact past 2**53 and in the full uint64 range
+    big = pd.DataFrame({"k": ["a", "a"], "i": [2**53, 1], "u": pd.array([2**63, 2**63 - 1], dtype="uint64")})
+    result = _group_summary(big, [1], [2, 3], "sum", _group_codes([big["k"]]))
+    assert result.values.tolist() == [["a", 2**53 + 1, 2**64 - 1]]
+
+    # Infinite aggregates reach the page as text, not as invalid JSON
+    inf = pd.DataFrame({"k": ["a", "b"], "x": [float("inf"), 1.0]})
+    rows = _json_rows(_group_summary(inf, [1], [2], "sum", _group_codes([inf["k"]])))
+    assert json.loads(json.dumps(rows, allow_nan=False)) == [["a", "inf"], ["b", 1.0]]
+
+
+def test_show_multiindex_header_and_index_levels():
+    index = pd.MultiIndex.from_tuples([("a", 1), ("a", 2), ("b", 1)], names=["k", "n"])
+    columns = pd.MultiIndex.from_tuples([("X", "p"), ("X", "q"), ("Y", "p")])
+    df = pd.DataFrame([[1, 4, 7], [2, 5, 8], [3, 6, 9]], index=index, columns=columns)
+    html = dfview.show(df, open_browser=False)
+    assert '"indexLevels": 2' in html
+    assert '"indexNames": ["k", "n"]' in html
+    assert '"header": [["X", "X", "Y"], ["p", "q", "p"]]' in html
+
+
+def test_show_wide_frame_renders_from_data():
+    df = pd.DataFrame([range(2000)] * 3)
+    html = dfview.show(df, open_browser=False)
+    assert "3 rows &times; 2000 columns" in html
+    # cells are rendered by the page script, not emitted as table markup
+    assert "<td" not in html
+
+
+def test_show_non_blocking_renders_snapshot():
+    df = pd.DataFrame({"a": ["value-before", "x"]})
+    future = dfview.show(df, open_browser=False, block=False)
+    df.loc[0, "a"] = "value-after"
+    html = future.result(timeout=30)
+    assert "value-before" in html
+    assert "value-after" not in html
+
+
+def test_show_async():
+    import asyncio
+
+    df = pd.DataFrame({"a": [1, 2]})
+    html = asyncio.run(dfview.show_async(df, open_browser=False))
+    assert "<table" in html
+
+
+def test_render_store_evicts_least_recently_used(tmp_path):
+    from dfview.session import RenderStore
+
+    store = RenderStore(str(tmp_path), max_bytes=25, max_files=10)
+    first = store.add("a" * 10)
+    second = store.add("b" * 10)
+    assert store.touch(first)
+    third = store.add("c" * 10)
+    assert not os.path.exists(second)
+    assert os.path.exists(first) and os.path.exists(third)
+    assert store.nbytes == 20
+    store.clear()
+    assert not os.path.exists(first)
+
+
+def test_show_reuse_tab_lists_recent_frames():
+    import json
+    import urllib.error
+    import urllib.request
+
+    from dfview.server import get_server
+
+    url = dfview.show(pd.DataFrame({"a": [1]}), open_browser=False, reuse_tab=True, name="first")
+    same = dfview.show(pd.DataFrame({"b": [2, 3]}), open_browser=False, reuse_tab=True, server=True)
+    assert url == same and "/session/" in url
+    with urllib.request.urlopen(url + "state") as resp:
+        frames = json.loads(resp.read())["frames"]
+    assert frames[1]["name"] == "first"
+    assert (frames[0]["rows"], frames[0]["cols"]) == (2, 1)
+    assert frames[0]["url"].startswith("/view/")
+    with urllib.request.urlopen(url + frames[1]["url"]) as resp:
+        assert "dfview-frame" in resp.read().decode("utf-8")
+
+    # A page evicted after the lookup is gone, not a server error
+    tab = get_server()._tab
+    os.remove(tab.frame_path(frames[1]["id"]))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url + frames[1]["url"])
+    assert error.value.code == 404
+
+
+def test_show_profile_records_phases_and_page_timings():
+    import json
+    import urllib.request
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    html = dfview.show(df, open_browser=False, profile=True)
+    record = dfview.stats()[-1]
+    assert {"format", "serialize", "template"} <= set(record["phases"])
+    assert record["bytes"]["page"] == len(html.encode("utf-8"))
+    assert record["peak_bytes"] > 0
+
+    url = dfview.show(df, open_browser=False, server=True, profile=True)
+    body = json.dumps({"op": "timings", "timings": {"parse": 1.5, "sort": 2}})
+    req = urllib.request.Request(url.replace("/view/", "/api/"), data=body.encode("utf-8"), method="POST")
+    urllib.request.urlopen(req).close()
+    assert dfview.stats()[-1]["page"] == {"parse": 1.5, "sort": 2.0}
+
+
+def test_show_accepts_arrow_and_polars():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"a": [3, 1, None], "s": ["x", None, "Y"]})
+    html = dfview.show(table, max_rows=2, open_browser=False)
+    assert '"totalRows": 3, "nRows": 2' in html
+    assert '"cells": [["0", "1"], ["3", "1"], ["x", "<NA>"]]' in html
+
+    pl = pytest.importorskip("polars")
+    html = dfview.show(pl.from_arrow(table), open_browser=False)
+    assert '"ranks": [[1, 2, 3], [2, 1, 3], [1, 3, 2]]' in html
+
+    with pytest.raises(TypeError):
+        dfview.show([1, 2, 3])
+
+
+def test_format_column_matches_to_html_for_object_values():
+    from dfview.dfview import _format_column
+
+    assert _format_column(pd.Series(["x", 1, None, 2.5])) == ["x", "1", "None", "2.5"]
+
+
+def test_format_columns_formats_dtype_blocks_as_format_column():
+    import numpy as np
+
+    from dfview.dfview import _format_column, _format_columns, _rendered_columns
+
+    df = pd.DataFrame(
+        {
+            "f": [1.5, float("nan"), 2.25, float("inf")],
+            "g": [1.0, 2.0, 3.0, 4.0],
+            "small": [1e-9, 1.0, 2.0, 3.0],
+            "large": [1234567.891, 2.0, 3.0, 4.0],
+            "i": [1, 2, 3, 4],
+            "b": [True, False, True, False],
+            "s": ["x", "y", None, "z"],
+            "f32": np.array([1.5, 2.0, 3.0, 4.0], dtype=np.float32),
+        }
+    )
+    columns = _rendered_columns(df)
+    assert _format_columns(columns) == [_format_column(c) for c in columns]
+    assert _format_columns(columns)[1] == ["1.50", "NaN", "2.25", "inf"]
+
+
+def test_diff_marks_changed_added_and_removed_rows():
+    from dfview.diff import _diff_frame
+
+    left = pd.DataFrame({"id": [1, 2, 3, 4], "x": [1.0, float("nan"), 3.0, 4.0], "s": ["a", "b", "c", "d"]})
+    right = pd.DataFrame({"id": [2, 3, 4, 5], "x": [float("nan"), 3.0 + 1e-12, 4.5, 5.0], "s": ["b", "c", "D", "e"]})
+    frame, marks = _diff_frame(left, right, "id", rtol=1e-9, atol=0.0)
+    assert list(frame.index) == [("removed", 1), ("changed", 4), ("added", 5)]
+    # changed columns keep their new, typed values; the old text is a mark
+    assert frame.loc[("changed", 4)].tolist() == [4.5, "D"]
+    assert frame["x"].dtype == float
+    assert marks["rows"] == [2, 0, 1]
+    assert marks["cells"] == [None, None, [1], [1]]
+    assert marks["old"] == [None, None, ["4.0"], ["d"]]
+
+    html = dfview.diff(left, right, key="id", open_browser=False)
+    assert "1 changed, 1 added, 1 removed" in html
+    assert "0 changed, 0 added, 0 removed" in dfview.diff(left, left, key="id", open_browser=False)
+
+
+def test_paged_diff_sends_marks_with_each_block():
+    import json
+    import re
+    import urllib.request
+
+    n = 2000
+    left = pd.DataFrame({"id": range(n), "x": [float(i) for i in range(n)]})
+    right = left.copy()
+    right.loc[::2, "x"] += 0.5
+    try:
+        dfview.configure_budget(memory_bytes=1)
+        url = dfview.diff(left, right, key="id", open_browser=False, server=True)
+    finally:
+        dfview.configure_budget()
+    with urllib.request.urlopen(url) as resp:
+        page = resp.read().decode("utf-8")
+    assert '"paged": true' in page
+    first = json.loads(re.search(r'id="dfview-frame">(.*?)</script>', page, re.S).group(1))["page"]
+    assert first["marks"]["rows"][:2] == [0, 0]
+    assert first["marks"]["old"][2][:2] == ["0.0", "2.0"]
+
+    body = json.dumps({"op": "rows", "view": {"sort": [[2, False]]}, "start": 0, "stop": 2}).encode("utf-8")
+    req = urllib.request.Request(url.replace("/view/", "/api/"), data=body, method="POST")
+    with urllib.request.urlopen(req) as resp:
+        block = json.loads(resp.read())
+    assert block["cells"][2] == ["1998.5", "1996.5"]
+    assert block["marks"]["cells"][2] == [0, 1]
+    assert block["marks"]["old"][2] == ["1998.0", "1996.0"]
+
+
+def test_show_empty_frame():
+    df = pd.DataFrame({"price": [1.5, 2.0], "s": ["a", "b"]})
+    html = dfview.show(df[df.price > 10], open_browser=False)
+    assert '"nRows": 0' in html
+    assert "dfview" in dfview.show_many({"x": df[df.price > 10]}, open_browser=False)
+
+
+def test_show_many_includes_assets_once():
+    frames = {f"frame {i}": pd.DataFrame({"a": [i, i + 1]}) for i in range(3)}
+    html = dfview.show_many(frames, open_browser=False)
+    assert html.count("function dfviewMount") == 1
+    assert html.count("<style>") == 1
+    assert html.count('type="application/json"') == 3
+    assert html.count("<button") == 3 and "frame 2" in html
+
+
+def test_paged_session_serves_views_and_row_blocks():
+    from dfview.dfview import _frame_payload
+    from dfview.server import FrameSession
+
+    big = pd.DataFrame({"a": range(1_000_000), "b": 0.5})
+    payload = _frame_payload(big, len(big), server=True, paged=True)
+    assert payload["cells"] is None and payload["ranks"] is None
+    assert len(payload["page"]["ids"]) == payload["blockRows"] == 256
+
+    df = pd.DataFrame({"n": [3, 1, 2, 5, 4], "s": ["a", "b", "a", None, "c"]})
+    session = FrameSession(df)
+    assert session.handle({"op": "values", "col": 2})["values"][:3] == ["a", "b", "c"]
+    view = {"sort": [[1, False]], "values": [{"col": 2, "exclude": ["c"]}], "query": "n > 1"}
+    result = session.handle({"op": "view", "view": view, "start": 0, "rows": 2})
+    assert result["length"] == 3
+    assert result["page"]["ids"] == [3, 0]
+    assert session.handle({"op": "rows", "view": view, "start": 2, "stop": 10})["cells"] == [["2"], ["2"], ["a"]]
+    result = session.handle({"op": "groupby", "keys": [2], "agg": "size", "view": view})
+    assert result["rows"] == [["a", 2], [None, 1]]
+
+
+def test_paged_blocks_and_values_format_floats_alike():
+    from dfview.dfview import _frame_payload
+    from dfview.server import FrameSession
+
+    df = pd.DataFrame({"x": [1.5] * 300 + [2.25] * 300})
+    session = FrameSession(df)
+    payload = _frame_payload(df, len(df), server=True, paged=True, session=session)
+    assert payload["page"]["cells"][1][0] == "1.50"
+    assert session.handle({"op": "rows", "view": {}, "start": 299, "stop": 301})["cells"][1] == ["1.50", "2.25"]
+    assert session.handle({"op": "values", "col": 1})["values"] == ["1.50", "2.25"]
+
+
+def test_show_picks_strategy_within_budget():
+    import base64
+    import gzip
+    import json
+    import re
+    import urllib.request
+
+    df = pd.DataFrame({"a": range(3000), "s": "x"})
+    sizes = dfview.estimate(df)
+    assert sizes["cells"] == 9000
+    assert "static page" in dfview.show(df, open_browser=False)
+    try:
+        dfview.configure_budget(page_bytes=sizes["page_bytes"] // 2)
+        html = dfview.show(df, open_browser=False)
+        assert "compressed page" in html
+        data = re.search(r'data-encoding="gzip">(.*?)</script>', html).group(1)
+        assert json.loads(gzip.decompress(base64.b64decode(data)))["cells"][1][:2] == ["0", "1"]
+
+        dfview.configure_budget(memory_bytes=sizes["memory_bytes"] // 4)
+        url = dfview.show(df, open_browser=False, server=True)
+        with urllib.request.urlopen(url) as resp:
+            page = resp.read().decode("utf-8")
+        assert '"paged": true' in page and "rows paged from Python" in page
+        # Asked for HTML, a frame over the memory budget is not built at all
+        with pytest.raises(ValueError, match="server=True"):
+            dfview.show(df, open_browser=False)
+        # but one only too large for a compressed page is compressed anyway
+        dfview.configure_budget(page_bytes=sizes["page_bytes"] // 10)
+        with pytest.warns(UserWarning, match="compressed page"):
+            assert "compressed page" in dfview.show(df, open_browser=False)
+    finally:
+        dfview.configure_budget()
+    # A given strategy is used as is, without estimating
+    with urllib.request.urlopen(dfview.show(df, open_browser=False, strategy="paged")) as resp:
+        assert "rows paged from Python" in resp.read().decode("utf-8")
+    with pytest.raises(ValueError):
+        dfview.show(df, open_browser=False, strategy="tiny")
+
+
 if __name__ == "__main__":
     test_import()
     test_show_returns_html()
@@ -73,3 +596,31 @@ if __name__ == "__main__":
     test_show_max_rows()
     test_show_has_filter_dropdowns()
     test_show_has_sort_arrows()
+    test_show_embeds_column_ranks()
+    test_sort_order_multi_column()
+    test_filter_mask_range_and_text()
+    test_payload_marks_missing_cells_for_text_filters()
+    test_show_server_mode_filters_in_python()
+    test_server_query_is_cached()
+    test_query_mask_rejects_non_boolean()
+    test_server_reports_failed_requests()
+    test_server_api_only_allows_local_origins()
+    test_viewer_server_bounds_and_releases_sessions()
+    test_server_groupby_reuses_group_codes()
+    test_group_summary_counts_and_means_over_group_codes()
+    test_show_multiindex_header_and_index_levels()
+    test_show_wide_frame_renders_from_data()
+    test_show_non_blocking_renders_snapshot()
+    test_show_async()
+    test_show_reuse_tab_lists_recent_frames()
+    test_show_profile_records_phases_and_page_timings()
+    test_show_accepts_arrow_and_polars()
+    test_format_column_matches_to_html_for_object_values()
+    test_format_columns_formats_dtype_blocks_as_format_column()
+    test_diff_marks_changed_added_and_removed_rows()
+    test_show_empty_frame()
+    test_paged_diff_sends_marks_with_each_block()
+    test_show_many_includes_assets_once()
+    test_paged_session_serves_views_and_row_blocks()
+    test_paged_blocks_and_values_format_floats_alike()
+    test_show_picks_strategy_within_budget()